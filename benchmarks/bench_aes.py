@@ -0,0 +1,21 @@
+import os
+
+from benchmarks.common import measure, result
+
+SIZES = [4 * 1024, 256 * 1024, 4 * 1024 * 1024]
+
+
+def run(workdir, quick=False):
+    """
+    Measures the AES decryption of compiled scripts of different sizes.
+    """
+    from vne.aes import AES
+    from vne.config import key
+
+    results = {}
+    for size in SIZES:
+        encrypted = AES(os.urandom(size), key).encrypt()
+        number = max(1, 1024 * 1024 // size)
+        best, median = measure(lambda: AES(encrypted, key).decrypt(), repeat=3 if quick else 5, number=number)
+        results[f"aes_decrypt.{size // 1024}kb"] = result(size / best / 2**20, "MB/s", True, median_s=median)
+    return results
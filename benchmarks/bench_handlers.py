@@ -0,0 +1,50 @@
+import os
+
+from benchmarks.common import measure, result, make_game, make_engine
+
+# name -> (commands executed per call, setup commands executed once)
+COMMANDS = {
+    "say": (["K: Hello, my name is {K} and this is a line of dialogue."], []),
+    "say_narration": (["This is a line of narration without a speaker."], []),
+    "bg": (["@bg bg0"], []),
+    "sprite": (["@sprite sprite0 at left"], []),
+    "sprite_hide": (["@sprite sprite1 at right", "@hide sprite1"], []),
+    "def": (["@def benchmark_var = \"value {K}\""], []),
+    "set": (["@set benchmark_var = \"new value\""], ["@def benchmark_var = \"value\""]),
+    "char": (["@char B as \"Benchmark\""], []),
+    "rename": (["@rename B as \"Renamed\""], ["@char B as \"Benchmark\""]),
+    "if": (["@if benchmark_flag", "@endif"], ["@def benchmark_flag = \"true\""]),
+    "bgm": (["@bgm bgm0"], []),
+    "sfx": (["@sfx sfx0"], []),
+    "checkpoint": (["@checkpoint benchmark_label"], []),
+    "choice": (["@choice", "@option \"First\" event Set(benchmark_var, true)",
+                "@option \"Second\" event Set(benchmark_var, false)", "@end_choice"],
+               ["@def benchmark_var = \"value\""]),
+}
+
+
+def run(workdir, quick=False):
+    """
+    Measures `EventManager.handle`, in commands per second for each opcode, on a headless engine.
+    """
+    from vne.compiler import compile_script
+
+    game_path = make_game(os.path.join(workdir, "handlers"))
+    engine = make_engine(game_path)
+    engine.event_manager.handle(("LoadSystem", ()), engine)
+
+    results = {}
+    number = 20 if quick else 200
+    for name, (lines, setup) in COMMANDS.items():
+        for command in compile_script("\n".join(setup), name).commands:
+            engine.event_manager.handle(command, engine)
+        commands = compile_script("\n".join(lines), name).commands
+
+        def execute():
+            for command in commands:
+                engine.event_manager.handle(command, engine)
+
+        best, median = measure(execute, repeat=3 if quick else 5, number=number)
+        results[f"handle.{name}"] = result(len(commands) / best, "commands/s", True, median_s=median)
+    engine.logger.close()
+    return results
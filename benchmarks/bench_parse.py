@@ -0,0 +1,22 @@
+from benchmarks.common import measure, result, generate_script
+
+SIZES = [1000, 10000, 100000, 1000000]
+QUICK_SIZES = [1000, 10000]
+
+
+def run(workdir, quick=False):
+    """
+    Measures `ScriptLexer.parse_script` on generated scripts of growing size.
+    """
+    from vne.lexer import ScriptLexer
+    from vne.compiler import Script
+
+    lexer = ScriptLexer(workdir, None, Script([]))
+    results = {}
+    for size in QUICK_SIZES if quick else SIZES:
+        content = generate_script(size)
+        lines = content.count("\n")
+        repeat = 5 if size <= 10000 else 1
+        best, median = measure(lambda: lexer.parse_script(content), repeat=repeat)
+        results[f"parse_script.{size}_lines"] = result(lines / best, "lines/s", True, median_s=median)
+    return results
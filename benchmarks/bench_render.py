@@ -0,0 +1,31 @@
+import os
+
+from benchmarks.common import measure, result, make_game, make_engine
+
+SPRITES = [0, 3, 10]
+LONG_DIALOGUE = " ".join(f"This is sentence number {index} of a long narration block." for index in range(40))
+
+
+def run(workdir, quick=False):
+    """
+    Measures the headless `Renderer.render` frame time with N sprites on screen and a
+    long dialogue. Frame pacing is off, so the numbers are the drawing cost only.
+    """
+    game_path = make_game(os.path.join(workdir, "render"), sprites=max(SPRITES))
+    engine = make_engine(game_path)
+    engine.event_manager.handle(("bg", ("bg0",)), engine)
+
+    results = {}
+    number = 10 if quick else 60
+    for count in SPRITES:
+        engine.sprites = {}
+        for index in range(count):
+            engine.event_manager.handle(("sprite", (f"sprite{index}", ("left", "center", "right")[index % 3])), engine)
+        for dialogue in ("", LONG_DIALOGUE):
+            engine.current_dialogue = dialogue
+            engine.current_character_name = "K" if dialogue else ""
+            best, median = measure(engine.renderer.render, repeat=3 if quick else 5, number=number)
+            label = "long_dialogue" if dialogue else "no_dialogue"
+            results[f"render.{count}_sprites.{label}"] = result(best * 1000, "ms", False, median_s=median)
+    engine.logger.close()
+    return results
@@ -0,0 +1,84 @@
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import measure, result, make_game
+
+FILES = {
+    "script": os.path.join("scenes", "first.kagc"),
+    "background": os.path.join("images", "bg", "bg0.jpg"),
+    "sprite": os.path.join("images", "sprites", "sprite0.png")
+}
+
+THREADS = (1, 2, 4, 8)
+
+
+def write_zip_pkg(data, output_pkg):
+    """
+    Packs `data` in the ZIP format written by older builds.
+    """
+    import pyzipper
+    from vne.config import key
+
+    with pyzipper.AESZipFile(output_pkg, "w", compression=pyzipper.ZIP_DEFLATED, encryption=pyzipper.WZ_AES) as pkg:
+        pkg.setpassword(key)
+        for root, dirs, files in os.walk(data):
+            for file in files:
+                if file.lower().endswith(".kag"):
+                    continue
+                path = os.path.join(root, file)
+                pkg.write(path, os.path.relpath(path, data))
+
+
+def throughput(manager, threads, reads):
+    """
+    Reads every file of `FILES` `reads` times from `threads` threads at once.
+
+    :return: Files read per second.
+    """
+    paths = list(FILES.values())
+
+    def worker(_):
+        for _ in range(reads):
+            for path in paths:
+                manager.get_bytes(path)
+
+    with ThreadPoolExecutor(threads) as pool:
+        # Opens the per-thread handles before the clock starts.
+        list(pool.map(lambda _: manager.get_bytes(paths[0]), range(threads * 4)))
+        start = time.perf_counter()
+        list(pool.map(worker, range(threads)))
+        elapsed = time.perf_counter() - start
+    return threads * reads * len(paths) / elapsed
+
+
+def run(workdir, quick=False):
+    """
+    Measures `ResourceManager.get_bytes` reading from data.pkg, from an old ZIP data.pkg
+    and from the loose data folder, on one thread and the throughput with several threads.
+    """
+    from vne.rm import ResourceManager
+
+    log = lambda message, level=None: None
+    game_path = make_game(os.path.join(workdir, "resources"), pkg=True)
+    zip_path = os.path.join(workdir, "resources-zip")
+    shutil.copytree(os.path.join(game_path, "data"), os.path.join(zip_path, "data"))
+    write_zip_pkg(os.path.join(zip_path, "data"), os.path.join(zip_path, "data.pkg"))
+
+    pkg = ResourceManager(game_path, log)
+    legacy_zip = ResourceManager(zip_path, log)
+    loose = ResourceManager(game_path, log)
+    loose.pack = None
+    loose.zipfile = None
+    loose.build_index()
+
+    results = {}
+    for source, manager in (("pkg", pkg), ("zip", legacy_zip), ("loose", loose)):
+        for name, path in FILES.items():
+            best, median = measure(lambda: manager.get_bytes(path), repeat=3 if quick else 5, number=20)
+            results[f"get_bytes.{source}.{name}"] = result(best * 1000, "ms", False, median_s=median)
+        for threads in THREADS:
+            rate = throughput(manager, threads, 20 if quick else 100)
+            results[f"get_bytes.{source}.threads_{threads}"] = result(rate, "files/s", True)
+    return results
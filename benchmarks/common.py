@@ -0,0 +1,116 @@
+import contextlib
+import io
+import os
+import statistics
+import struct
+import sys
+import time
+import wave
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+
+def measure(func, repeat=5, number=1):
+    """
+    Calls `func` `number` times per round, for `repeat` rounds.
+
+    :return: The duration of one call in seconds: the best and median of the rounds.
+    """
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        rounds.append((time.perf_counter() - start) / number)
+    return min(rounds), statistics.median(rounds)
+
+
+def result(value, unit, higher_is_better, **extra):
+    """
+    Builds one entry of the results file.
+    """
+    entry = {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+    entry.update(extra)
+    return entry
+
+
+def generate_script(lines, characters=("K", "A")):
+    """
+    Generates a scene script of about `lines` lines mixing dialogue, narration,
+    images, variables, conditionals, menus and checkpoints.
+    """
+    out = []
+    block = 0
+    while len(out) < lines:
+        speaker = characters[block % len(characters)]
+        out.extend([
+            f"{speaker}: Line {block}, my name is {{{speaker}}} and this is some dialogue.",
+            f"Narration {block} describes the scene in a few more words than the dialogue.",
+            f"@bg bg{block % 4}",
+            f"@sprite sprite{block % 3} at left",
+            f"@def var{block} = \"value {block}\"",
+            f"@if var{block}",
+            f"{speaker}: The variable is set.",
+            "@else",
+            f"{speaker}: The variable is not set.",
+            "@endif",
+            "@choice",
+            f"@option \"First {block}\" event Set(var{block}, true)",
+            f"@option \"Second {block}\" event Set(var{block}, false)",
+            "@end_choice",
+            f"@checkpoint label{block}",
+            f"# comment {block}",
+        ])
+        block += 1
+    return "\n".join(out) + "\n"
+
+
+def make_game(game_path, sprites=3, backgrounds=4, image_size=(1280, 720), pkg=False):
+    """
+    Creates a project with `init_game`, adds placeholder images and sounds and compiles it.
+    With `pkg` the data folder is also packed in data.pkg.
+    """
+    import main
+    from vne.config import key
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        main.init_game(game_path, "benchmark")
+        data = os.path.join(game_path, "data")
+        for index in range(backgrounds):
+            surface = pygame.Surface(image_size)
+            surface.fill((index * 40 % 256, 80, 160))
+            pygame.image.save(surface, os.path.join(data, "images", "bg", f"bg{index}.jpg"))
+        for index in range(sprites):
+            surface = pygame.Surface((image_size[0] // 3, image_size[1]), pygame.SRCALPHA)
+            surface.fill((200, index * 60 % 256, 50, 255))
+            pygame.image.save(surface, os.path.join(data, "images", "sprites", f"sprite{index}.png"))
+        for kind, seconds in (("bgm", 5), ("sfx", 1)):
+            os.makedirs(os.path.join(data, "audio", kind), exist_ok=True)
+            # WAV data, pygame.mixer reads it whatever the extension.
+            with wave.open(os.path.join(data, "audio", kind, f"{kind}0.mp3"), "wb") as w:
+                w.setnchannels(2)
+                w.setsampwidth(2)
+                w.setframerate(44100)
+                w.writeframes(struct.pack("<h", 0) * 2 * 44100 * seconds)
+        main.compile_all_kag_in_folder(data, key)
+        if pkg:
+            main.create_data_pkg(data, os.path.join(game_path, "data.pkg"))
+    return game_path
+
+
+def make_engine(game_path):
+    """
+    Creates a headless engine for `game_path`, ready to execute commands.
+    """
+    from vne import Core
+
+    engine = Core(game_path, headless=True)
+    engine.renderer.initialize()
+    return engine
@@ -0,0 +1,222 @@
+"""
+Generates a complete project in the `init_game` layout, with as much content as needed
+to measure the engine at the size of a real game (or many times bigger).
+
+    python -m benchmarks.generate_game -o big-game --scenes 200 --lines 500
+    python -m benchmarks.generate_game -o big-game --scale 10 --distribute
+
+Every count can be set on the command line; --scale multiplies the number of scenes and
+of assets. The same seed always generates the same game.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import struct
+import wave
+
+from benchmarks import common  # sets up sys.path and the SDL dummy drivers
+
+import pygame
+
+DEFAULTS = {
+    "scenes": 20,
+    "lines": 200,
+    "characters": 6,
+    "variables": 20,
+    "if_depth": 2,
+    "menus": 2,
+    "backgrounds": 10,
+    "sprites": 12,
+    "bgm": 4,
+    "sfx": 8,
+    "image_width": 1280,
+    "image_height": 720,
+    "audio_seconds": 5,
+    "seed": 0
+}
+
+WORDS = ("the", "a", "school", "night", "light", "door", "rain", "letter", "train", "garden",
+         "quiet", "bright", "slowly", "never", "remember", "tomorrow", "walked", "found", "said", "smiled")
+
+
+class GameGenerator:
+    """
+    Writes the scripts and placeholder assets of a generated project.
+
+    :param game_path: Folder of the new project.
+    :param options: Counts and sizes, see `DEFAULTS`.
+    """
+    def __init__(self, game_path, **options):
+        self.game_path = game_path
+        self.data = os.path.join(game_path, "data")
+        self.options = dict(DEFAULTS, **options)
+        self.random = random.Random(self.options["seed"])
+        self.lines_written = 0
+
+    def sentence(self, min_words=6, max_words=18):
+        words = [self.random.choice(WORDS) for _ in range(self.random.randint(min_words, max_words))]
+        return " ".join(words).capitalize() + "."
+
+    def write(self, relative_path, lines):
+        self.lines_written += len(lines)
+        with open(os.path.join(self.data, relative_path), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def generate(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            import main
+            main.init_game(self.game_path, "generated")
+        os.makedirs(os.path.join(self.data, "audio", "bgm"), exist_ok=True)
+        os.makedirs(os.path.join(self.data, "audio", "sfx"), exist_ok=True)
+        self.generate_system()
+        for index in range(self.options["scenes"]):
+            self.write(os.path.join("scenes", f"scene_{index}.kag"), self.scene(index))
+        self.generate_images()
+        self.generate_audio()
+        return self.game_path
+
+    def generate_system(self):
+        o = self.options
+        self.write(os.path.join("system", "characters.kag"),
+                   [f"@char C{index} as \"Character {index}\"" for index in range(o["characters"])])
+        self.write(os.path.join("system", "vars.kag"),
+                   [f"@def v{index} = \"false\"" for index in range(o["variables"])])
+        self.write(os.path.join("system", "scenes.kag"),
+                   [f"@scene s{index} = \"scene_{index}\"" for index in range(o["scenes"])])
+        self.write(os.path.join("system", "main_menu.kag"), [
+            "@menu",
+            "@bg bg0",
+            "@button \"Start game\" event Scene(\"s0\")",
+            "@button \"Quit\" event Quit()",
+            "@endMenu"
+        ])
+
+    def dialogue(self):
+        if self.random.random() < 0.2:
+            return self.sentence()
+        speaker = self.random.randrange(self.options["characters"])
+        return f"C{speaker}: {self.sentence()}"
+
+    def conditional(self, depth):
+        o = self.options
+        var = self.random.randrange(o["variables"])
+        lines = [f"@if v{var}", self.dialogue()]
+        if depth > 1:
+            lines.extend(self.conditional(depth - 1))
+        lines.extend(["@else", self.dialogue()])
+        if depth > 1:
+            lines.extend(self.conditional(depth - 1))
+        lines.append("@endif")
+        return lines
+
+    def menu(self):
+        o = self.options
+        lines = ["@choice"]
+        for option in range(self.random.randint(2, 4)):
+            var = self.random.randrange(o["variables"])
+            lines.append(f"@option \"{self.sentence(2, 5)}\" event Set(v{var}, {self.random.choice(('true', 'false'))})")
+        lines.append("@end_choice")
+        return lines
+
+    def scene(self, index):
+        """
+        Generates one scene: dialogue with background and sprite changes, sound, nested
+        conditionals and choice menus, ending with a jump to the next scene.
+        """
+        o = self.options
+        lines = [f"@bg bg{self.random.randrange(o['backgrounds'])}"]
+        if o["bgm"]:
+            lines.append(f"@bgm bgm{self.random.randrange(o['bgm'])}")
+        menus_left = o["menus"]
+        target = o["lines"]
+        while len(lines) < target:
+            roll = self.random.random()
+            if menus_left and roll < 0.05:
+                lines.extend(self.menu())
+                menus_left -= 1
+            elif o["if_depth"] and roll < 0.12:
+                lines.extend(self.conditional(o["if_depth"]))
+            elif roll < 0.2:
+                lines.append(f"@bg bg{self.random.randrange(o['backgrounds'])}")
+            elif roll < 0.3:
+                position = self.random.choice(("left", "center", "right"))
+                lines.append(f"@sprite sprite{self.random.randrange(o['sprites'])} at {position}")
+            elif o["sfx"] and roll < 0.32:
+                lines.append(f"@sfx sfx{self.random.randrange(o['sfx'])}")
+            else:
+                lines.append(self.dialogue())
+        for _ in range(menus_left):
+            lines.extend(self.menu())
+        if index + 1 < o["scenes"]:
+            lines.append(f"@jump_scene s{index + 1}")
+        else:
+            lines.append("@exit")
+        return lines
+
+    def image(self, size, alpha=False):
+        # Noise instead of a flat color, so the files have a realistic size.
+        width, height = size
+        channels = 4 if alpha else 3
+        pixels = self.random.randbytes(width * height * channels)
+        return pygame.image.frombuffer(pixels, size, "RGBA" if alpha else "RGB")
+
+    def generate_images(self):
+        o = self.options
+        size = (o["image_width"], o["image_height"])
+        for index in range(o["backgrounds"]):
+            pygame.image.save(self.image(size), os.path.join(self.data, "images", "bg", f"bg{index}.jpg"))
+        for index in range(o["sprites"]):
+            sprite_size = (max(1, size[0] // 3), size[1])
+            pygame.image.save(self.image(sprite_size, True), os.path.join(self.data, "images", "sprites", f"sprite{index}.png"))
+
+    def generate_audio(self):
+        # The engine loads audio through pygame.mixer.Sound, which also reads WAV data.
+        o = self.options
+        for kind in ("bgm", "sfx"):
+            seconds = o["audio_seconds"] if kind == "bgm" else max(1, o["audio_seconds"] // 5)
+            frames = struct.pack("<h", 0) * 2 * 44100 * seconds
+            for index in range(o[kind]):
+                with wave.open(os.path.join(self.data, "audio", kind, f"{kind}{index}.mp3"), "wb") as w:
+                    w.setnchannels(2)
+                    w.setsampwidth(2)
+                    w.setframerate(44100)
+                    w.writeframes(frames)
+
+
+def generate_game(game_path, **options):
+    """
+    Generates a project at `game_path`, see `DEFAULTS` for the options.
+
+    :return: The number of script lines written.
+    """
+    generator = GameGenerator(game_path, **options)
+    generator.generate()
+    return generator.lines_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates a synthetic VNE project")
+    parser.add_argument("-o", dest="output", required=True, help="folder of the new project")
+    parser.add_argument("--scale", dest="scale", default=1, type=int,
+                        help="multiplies the number of scenes and assets")
+    for name, value in DEFAULTS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, default=value, type=type(value))
+    parser.add_argument("--distribute", dest="distribute", default=False, action="store_true",
+                        help="compile and package the project with distribute_game")
+    args = parser.parse_args()
+
+    options = {name: getattr(args, name) for name in DEFAULTS}
+    for name in ("scenes", "backgrounds", "sprites", "bgm", "sfx"):
+        options[name] *= args.scale
+    lines = generate_game(args.output, **options)
+    print(f"[generate_game] {options['scenes']} scenes, {lines} lines written to '{args.output}'.")
+
+    if args.distribute:
+        import main
+        main.distribute_game(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Runs the engine benchmarks and writes the results as JSON.
+
+    python -m benchmarks.run -o results.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 15
+
+Every result has a value, its unit and whether higher is better. With --baseline the
+results are compared against a previous results file, and the exit code is 1 if any of
+them got worse by more than --threshold percent.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+
+from benchmarks import common
+from benchmarks import bench_parse, bench_handlers, bench_resources, bench_aes, bench_render
+from vne.config import engine_version
+
+SUITES = {
+    "parse": bench_parse,
+    "handlers": bench_handlers,
+    "resources": bench_resources,
+    "aes": bench_aes,
+    "render": bench_render
+}
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares the results with a baseline.
+
+    :return: The lines of the comparison report and the names of the regressed results.
+    """
+    lines = []
+    regressions = []
+    for name, entry in results.items():
+        previous = baseline.get(name)
+        if previous is None or not previous["value"]:
+            lines.append(f"{name:<48}{entry['value']:>14.3f} {entry['unit']:<11} (new)")
+            continue
+        change = (entry["value"] - previous["value"]) / previous["value"] * 100
+        worse = -change if entry["higher_is_better"] else change
+        flag = ""
+        if worse > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        lines.append(f"{name:<48}{entry['value']:>14.3f} {entry['unit']:<11}{change:>+8.1f}%{flag}")
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VNE benchmarks")
+    parser.add_argument("-o", dest="output", default="benchmark-results.json", help="results file")
+    parser.add_argument("--baseline", dest="baseline", default=None, help="results file to compare against")
+    parser.add_argument("--threshold", dest="threshold", default=10.0, type=float,
+                        help="percentage a result can get worse before it's reported as a regression")
+    parser.add_argument("--only", dest="only", default=None, help=f"comma separated suites: {', '.join(SUITES)}")
+    parser.add_argument("--quick", dest="quick", default=False, action="store_true",
+                        help="smaller inputs and fewer rounds")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(SUITES)
+    for name in names:
+        if name not in SUITES:
+            raise Exception(f"[benchmarks] Unknown suite '{name}'.")
+
+    workdir = tempfile.mkdtemp(prefix="vne-bench-")
+    results = {}
+    try:
+        for name in names:
+            print(f"[benchmarks] {name}...")
+            results.update(SUITES[name].run(workdir, args.quick))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "engine_version": engine_version,
+            "python": platform.python_version(),
+            "platform": f"{platform.system()}-{platform.machine()}",
+            "quick": args.quick
+        },
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    lines, regressions = compare(results, baseline, args.threshold)
+    print("\n".join(lines))
+    print(f"[benchmarks] Results saved to '{args.output}'.")
+    if regressions:
+        print(f"[benchmarks] {len(regressions)} regressions over {args.threshold}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
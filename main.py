@@ -2,73 +2,114 @@ import os
 import shutil
 import sys
 import argparse
-import pyzipper
+import json
+import multiprocessing
 from datetime import datetime
 import platform
 from vne import Core
-from vne import aes
+from vne import build
+from vne import pack
+from vne.input import ScriptedInput
 from vne import config as CONFIG
 from vne.config import key, engine_version
 
 
-def compile_kag(source_file, target_file, key):
+def compile_kag(source_file, target_file, key, plain_text=None):
     """
-    Reads a source file, encodes its content using an AES operation with a given key,
-    and writes the result to a target file.
+    Reads a source file, compiles it into a pre-tokenized command stream, encodes the
+    stream using an AES operation with a given key, and writes the result to a target file.
     
     :param source_file: The path to the source file containing the plain text data.
     :param target_file: The file path where the compiled data will be written in binary format.
     :param key: The key used to perform AES encryption on the data.
+    :param plain_text: The content of the source file, if it was already read.
     """
-    with open(source_file, "r", encoding="utf-8") as sf:
-        plain_text = sf.read()
-    plain_bytes = plain_text.encode("utf-8")
-    compiled_bytes = aes.AES(plain_bytes, key).encrypt()
-    with open(target_file, "wb") as tf:
-        tf.write(compiled_bytes)
-    
- 
+    if plain_text is None:
+        with open(source_file, "r", encoding="utf-8") as sf:
+            plain_text = sf.read()
+    build.compile_source(source_file, target_file, key, plain_text)
     print(f"[compile_kag] {source_file} -> {target_file}")
  
 
-def compile_all_kag_in_folder(data_folder, key):
+def compile_all_kag_in_folder(data_folder, key, workers=None):
     """
-    Compiles all KAG files in the specified folder using the given key.
+    Compiles the KAG files in the specified folder using the given key. Only the files that
+    changed since the last build are compiled (see `vne.build.BuildManifest`), and the
+    .kagc files of deleted sources are removed.
     
     :param data_folder: The directory path where the KAG files are located.
     :param key: The key used for encryption/decryption.
+    :param workers: Number of worker processes, one per CPU by default.
     """
+    manifest = build.BuildManifest(data_folder, key)
+    names = set()
+    jobs = []
+    records = []
     for root, dirs, files in os.walk(data_folder):
         for file in files:
             if file.endswith(".kag"):
                 source_path = os.path.join(root, file)
-                target_path = os.path.splitext(source_path)[0] + ".kagc"
-                compile_kag(source_path, target_path, key)
+                name = os.path.relpath(source_path, data_folder).replace(os.sep, "/")
+                names.add(name)
+                stat = os.stat(source_path)
+                if manifest.up_to_date(name, stat):
+                    continue
+                with open(source_path, "rb") as sf:
+                    source = sf.read()
+                digest = build.file_hash(source)
+                if not manifest.same_content(name, digest):
+                    target_path = os.path.splitext(source_path)[0] + ".kagc"
+                    # Same newline translation as reading the file in text mode.
+                    plain_text = source.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+                    jobs.append((source_path, target_path, key, plain_text))
+                records.append((name, stat, digest))
+    workers = build.effective_workers(workers, len(jobs))
+    progress = build.Progress("[compile_kag]", len(jobs), sum(len(job[3]) for job in jobs))
+    for job, target_path in zip(jobs, build.ordered_map(build.compile_source, jobs, workers)):
+        print(f"[compile_kag] {job[0]} -> {target_path}")
+        progress.advance(len(job[3]))
+    if jobs:
+        progress.finish(workers)
+    for record in records:
+        manifest.record(*record)
+    for target_path in manifest.remove_stale(names):
+        print(f"[compile_kag] Removed '{target_path}', its source was deleted")
+    manifest.save()
+    print(f"[compile_kag] {len(jobs)} compiled, {len(names) - len(jobs)} up to date")
 
 
-def create_data_pkg(source_folder, output_pkg):
+def create_data_pkg(source_folder, output_pkg, workers=None):
     """
-    Recursively packs the files in the source_folder into an encrypted ZIP archive,
+    Recursively packs the files in the source_folder into an encrypted pack (see `vne.pack`),
     excluding single .kag files (only .kagc or other files are included).
 
+    Files are compressed and encrypted by worker processes and written in the order of their
+    path, with a salt derived from the key, so the same data always gives the same pack,
+    whatever the number of workers.
+
     param source_folder: Path of the folder with the data to be packed.
-    :param output_pkg: Path of the ZIP file to be created.
+    :param output_pkg: Path of the pack file to be created.
+    :param workers: Number of worker processes, one per CPU by default.
     """
-    with pyzipper.AESZipFile(
-            output_pkg,
-            'w',
-            compression=pyzipper.ZIP_DEFLATED,
-            encryption=pyzipper.WZ_AES) as pkg:
-        pkg.setpassword(key)
-        for root, dirs, files in os.walk(source_folder):
-            for file in files:
-                
-                if file.lower().endswith(".kag") and not file.lower().endswith(".kagc"):
-                    continue
-                file_path = os.path.join(root, file)
+    files = []
+    for root, dirs, names in os.walk(source_folder):
+        for file in names:
             
-                rel_path = os.path.relpath(file_path, source_folder)
-                pkg.write(file_path, rel_path)
+            if file.lower().endswith(".kag") and not file.lower().endswith(".kagc"):
+                continue
+            file_path = os.path.join(root, file)
+        
+            rel_path = os.path.relpath(file_path, source_folder).replace(os.sep, "/")
+            files.append((rel_path, file_path))
+    files.sort()
+    workers = build.effective_workers(workers, len(files))
+    progress = build.Progress("[create_data_pkg]", len(files), sum(os.path.getsize(path) for _, path in files))
+    with pack.PackWriter(output_pkg, key, pack.deterministic_salt(key)) as pkg:
+        jobs = [(pkg.key, pkg.nonce_key, rel_path, file_path) for rel_path, file_path in files]
+        for entry in build.ordered_map(pack.seal_file, jobs, workers):
+            pkg.add_sealed(*entry)
+            progress.advance(entry[3])
+    progress.finish(workers)
     print(f"[create_data_pkg] '{source_folder}' packed in '{output_pkg}' (excluding .kag files)")
 
 def init_game(game_path, project_name):
@@ -152,22 +193,23 @@ def init_game(game_path, project_name):
 
     print("Files generated successfully")
 
-def distribute_game(game_path):
+def distribute_game(game_path, workers=None):
     """
     Packages a game located at the specified path by compiling data files, creating a package,
     copying necessary files to a distribution folder, and outputting the distribution location.
     
     :param game_path: The path to the directory containing the game files to be distributed.
+    :param workers: Number of worker processes used to compile and pack, one per CPU by default.
     """
     print(f"Packaging game from '{game_path}'...")
     game_path = os.path.abspath(game_path)
     game_name = os.path.basename(game_path)
  
     data_folder = os.path.join(game_path, "data")
-    compile_all_kag_in_folder(data_folder, key)
+    compile_all_kag_in_folder(data_folder, key, workers)
  
     pkg_path = os.path.join(game_path, "data.pkg")
-    create_data_pkg(data_folder, pkg_path)
+    create_data_pkg(data_folder, pkg_path, workers)
 
     current_dir = os.getcwd()
     dist_root = os.path.join(current_dir, "dist")
@@ -190,11 +232,14 @@ def distribute_game(game_path):
 
     print(f"Distribution completed at: {dest_folder}")
 
-def run_game(game_path):
+def run_game(game_path, profile=False, headless=False, choices=None):
     """
     Compiles all KAG files in the specified folder and runs the game engine with the given game path in development mode.
     
     :param game_path: The path to the directory where the game files are located.
+    :param profile: Records a profile of the session, saved as profile.json in the game folder.
+    :param headless: Runs without a window, advancing the dialogues automatically.
+    :param choices: Comma separated indexes of the options picked in each menu when headless.
     """
     data_folder = os.path.join(game_path, "data")
 
@@ -202,9 +247,31 @@ def run_game(game_path):
     compile_all_kag_in_folder(data_folder, key)
     print("-----------------------------")
 
-    engine = Core(game_path, devMode=True)
+    player_input = None
+    if headless and choices:
+        player_input = ScriptedInput([int(choice) for choice in choices.split(",")])
+    engine = Core(game_path, devMode=True, profile=profile, headless=headless, input=player_input)
     engine.run()
 
+def explore_game(game_path, workers=None, output=None):
+    """
+    Compiles the game and explores every path of its story without rendering, printing the
+    reachable scenes, unreachable lines and errors.
+    
+    :param game_path: The path to the directory where the game files are located.
+    :param workers: Number of worker processes, one per CPU by default.
+    :param output: Optional path of a JSON file where the full report is saved.
+    """
+    from vne.explorer import StoryExplorer, format_report
+
+    compile_all_kag_in_folder(os.path.join(game_path, "data"), key)
+    report = StoryExplorer(game_path, workers).run().report()
+    print(format_report(report))
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
 def main():
     """
     Parses command line arguments to initialize, debug, or distribute a game based on the specified command.
@@ -215,6 +282,12 @@ def main():
     parser.add_argument('-p', dest="project_name", default=None, type=str, help="allows you to add a name to the project if -i is present", required='-i' in sys.argv)
     
     parser.add_argument('-r', dest="debug_project", default=False, action="store_true", help="debug a project")
+    parser.add_argument('--profile', dest="profile", default=False, action="store_true", help="profile the project if -r is present")
+    parser.add_argument('--headless', dest="headless", default=False, action="store_true", help="run the project without a window if -r is present")
+    parser.add_argument('--choices', dest="choices", default=None, type=str, help="options picked in each menu when --headless is present, eg. 0,1,0")
+    parser.add_argument('-x', dest="explore_project", default=False, action="store_true", help="explore every path of a project")
+    parser.add_argument('--workers', dest="workers", default=None, type=int, help="worker processes used by -x and -d")
+    parser.add_argument('--report', dest="report", default=None, type=str, help="JSON file where -x saves its report")
     parser.add_argument('-d', dest="distribute_project", default=False, action="store_true", help="distribute a project")
     
     parser.add_argument('-f', dest="project_folder", default=None, type=str, help="Project Folder (required)", required=True)
@@ -231,13 +304,17 @@ def main():
     if isNewProject and project_name and project_folder and not "python.exe" in exe_name:
         init_game(project_folder, project_name)
     elif debug_project and project_folder:
-        run_game(project_folder)
+        run_game(project_folder, args.profile, args.headless, args.choices)
+    elif args.explore_project and project_folder:
+        explore_game(project_folder, args.workers, args.report)
     elif distribute_project and project_folder and not "python.exe" in exe_name:
-        distribute_game(project_folder)
+        distribute_game(project_folder, args.workers)
     else:
         raise Exception("Mising aguments or argument is invalid")
 
 if __name__ == "__main__":
+    # The build and the explorer start worker processes, which re-run the frozen executable.
+    multiprocessing.freeze_support()
 
     try:
         exe_name = os.path.basename(sys.executable).lower()
@@ -1,44 +1,66 @@
 import pygame
 import io
 import os
+
+
+def sound_size(sound):
+    """
+    Returns the size in bytes of the decoded samples of a Sound.
+    """
+    frequency, size, channels = pygame.mixer.get_init()
+    return int(sound.get_length() * frequency) * channels * abs(size) // 8
+
+
+def sound_playing(sound):
+    return sound.get_num_channels() > 0
+
+
 class Audio(object):
-    instances = []
+    """
+    Background music is streamed with `pygame.mixer.music`: the compressed file is
+    decoded while it plays, so only the mixer buffer is kept as PCM. Sound effects are
+    short, they are decoded into a `pygame.mixer.Sound` and kept in `engine.sounds`,
+    so an effect played again isn't decoded again.
+    """
     def __init__(self, filename, type_file="bgm", engine=None):
         super(Audio, self).__init__()
         assert isinstance(filename, str)
-        self.bytes_io = None
+        self.stream = None
+        self.sound = None
         self.filename = filename
         self.type_file = type_file
         self.engine = engine
-        self.sound = self.load_audio()
-        Audio.instances.append(self)
+        self.load_audio()
     
     def load_audio(self):
         rel_path = os.path.join("audio", self.type_file, self.filename + ".mp3")
         try:
-            audio_bytes = self.engine.resource_manager.get_bytes(rel_path)  
-            self.bytes_io = io.BytesIO(audio_bytes)
-            self.bytes_io.seek(0)
-            return pygame.mixer.Sound(self.bytes_io)
+            if self.type_file == "bgm":
+                self.stream = self.engine.assets.fetch(("music", rel_path), lambda: self.engine.resource_manager.open(rel_path))
+            else:
+                key = (self.type_file, self.filename)
+                self.sound = self.engine.sounds.get(key)
+                if self.sound is None:
+                    self.sound = self.engine.assets.fetch(("sound", rel_path), lambda: self.decode(rel_path))
+                    self.engine.sounds.put(key, self.sound)
         except Exception as e:
-                raise Exception(f"[bgm] Error loading background music from '{rel_path}': {e}")
+                raise Exception(f"[{self.type_file}] Error loading audio from '{rel_path}': {e}")
     
-    def get_channel(self):
-
-        if self.type_file == "bgm":
-            return pygame.mixer.Channel(0)
-
-        return pygame.mixer.Channel(1)
+    def decode(self, rel_path):
+        # The Sound copies the decoded samples, the bytes can be released.
+        audio_bytes = self.engine.resource_manager.get_bytes(rel_path)
+        return pygame.mixer.Sound(io.BytesIO(audio_bytes))
 
     def play(self, channel_id=0, loop=0, fade_ms=1000):
         """
-        The function `play` plays the audio on the specified channel.
-        :param channel: The `play` method takes an integer `channel` as input, which specifies the audio channel to play the sound on.
-        """
-        channel = self.get_channel()
-        
-        if channel.get_busy():
-            channel.fadeout(500)
-            pygame.time.delay(700)
+        Plays the audio through the engine mixer: music replaces the current track, sound
+        effects take a channel of the effects pool. It returns immediately, fades are
+        advanced by the frame loop.
 
-        channel.play(self.sound, loops=loop, fade_ms=fade_ms)
\ No newline at end of file
+        :param loop: Times the audio repeats, -1 to loop forever.
+        :param fade_ms: Length of the fade in.
+        """
+        if self.stream is not None:
+            self.engine.mixer.play_music(self, loop, fade_ms)
+        else:
+            self.engine.mixer.play_sound(self.sound, loop, fade_ms)
@@ -10,8 +10,12 @@ class AES:
         self.block_size = block_size
 
     
-    def encrypt(self) -> bytes:
-        iv = os.urandom(16)
+    def encrypt(self, iv: bytes = None) -> bytes:
+        """
+        :param iv: 16 bytes, random by default. Reproducible builds pass one derived from the data.
+        """
+        if iv is None:
+            iv = os.urandom(16)
         backend = default_backend()
         cipher = Cipher(algorithms.AES(self.key), modes.CBC(iv), backend=backend)
         encryptor = cipher.encryptor()
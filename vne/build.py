@@ -0,0 +1,205 @@
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from vne import compiler
+from vne.aes import AES
+from vne.config import engine_version
+
+MANIFEST_NAME = "build_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def key_fingerprint(key):
+    """
+    Returns a short hash identifying the key, so the manifest can tell when scripts were
+    compiled with another key without storing the key itself.
+    """
+    return hashlib.sha256(b"vne-build-manifest" + key).hexdigest()[:16]
+
+
+def file_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class BuildManifest:
+    """
+    Records the .kag sources compiled in a data folder: their modification time, size and
+    content hash, plus the key and compiler that produced the .kagc files. It is stored
+    next to the data folder (so it isn't packed) and lets a build recompile only the
+    scripts that changed.
+
+    A manifest written with another key, compiler format or engine version is ignored,
+    which recompiles everything.
+
+    :param data_folder: The data folder of the game.
+    :param key: The key the scripts are encrypted with.
+    """
+    def __init__(self, data_folder, key):
+        self.data_folder = data_folder
+        self.path = os.path.join(os.path.dirname(os.path.abspath(data_folder)), MANIFEST_NAME)
+        self.build = {
+            "version": MANIFEST_VERSION,
+            "key": key_fingerprint(key),
+            "format": compiler.FORMAT_VERSION,
+            "engine": engine_version
+        }
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("build") == self.build:
+            self.entries = data.get("files", {})
+
+    def save(self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"build": self.build, "files": self.entries}, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def target(self, name):
+        return os.path.join(self.data_folder, os.path.splitext(name)[0] + ".kagc")
+
+    def up_to_date(self, name, stat):
+        """
+        Returns True if the source `name` has the size and mtime it had when it was last
+        compiled and its .kagc file is still there. Doesn't read the source.
+        """
+        entry = self.entries.get(name)
+        return (entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+                and os.path.exists(self.target(name)))
+
+    def same_content(self, name, digest):
+        """
+        Returns True if the source `name` was touched but its content didn't change.
+        """
+        entry = self.entries.get(name)
+        return entry is not None and entry["hash"] == digest and os.path.exists(self.target(name))
+
+    def record(self, name, stat, digest):
+        self.entries[name] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "hash": digest}
+
+    def remove_stale(self, names):
+        """
+        Deletes the .kagc files of the recorded sources that aren't in `names` anymore.
+
+        :return: The paths of the deleted files.
+        """
+        removed = []
+        for name in [name for name in self.entries if name not in names]:
+            del self.entries[name]
+            target = self.target(name)
+            if os.path.exists(target):
+                os.remove(target)
+                removed.append(target)
+        return removed
+
+
+def derive_iv(key, data):
+    """
+    Derives the IV of a compiled script from its content, so compiling the same source
+    with the same key always gives the same .kagc file. Equal scripts get equal
+    ciphertexts, nothing else is revealed.
+    """
+    mac = hmac.new(hashlib.sha256(b"vne-kagc-iv" + key).digest(), data, hashlib.sha256)
+    return mac.digest()[:16]
+
+
+def compile_source(source_path, target_path, key, plain_text):
+    """
+    Compiles one script and writes the encrypted .kagc file. It only depends on its
+    arguments, so scripts can be compiled in worker processes.
+
+    :return: The path of the written file.
+    """
+    script = compiler.compile_script(plain_text, source_path)
+    data = compiler.dumps(script)
+    with open(target_path, "wb") as f:
+        f.write(AES(data, key).encrypt(derive_iv(key, data)))
+    return target_path
+
+
+def default_workers(workers):
+    return (os.cpu_count() or 1) if workers is None else workers
+
+
+def effective_workers(workers, job_count, min_jobs=8):
+    """
+    Returns the number of processes `ordered_map` runs `job_count` jobs on: 1 when they run
+    in this process (0 or 1 workers, or fewer than `min_jobs` jobs, where starting the pool
+    would take longer), `workers` otherwise.
+    """
+    workers = default_workers(workers)
+    return 1 if workers <= 1 or job_count < min_jobs else workers
+
+
+def ordered_map(function, jobs, workers=None, window=None, min_jobs=8):
+    """
+    Runs `function(*job)` for every job on a process pool and yields the results in the
+    order of `jobs`, whatever order they finish in. At most `window` jobs (4 per worker by
+    default) are pending at once, so results don't pile up in memory while an earlier
+    job is still running. The jobs run in this process when `effective_workers` is 1.
+    """
+    workers = effective_workers(workers, len(jobs), min_jobs)
+    if workers == 1:
+        for job in jobs:
+            yield function(*job)
+        return
+    window = window or workers * 4
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        jobs = iter(jobs)
+        for job in itertools.islice(jobs, window):
+            pending.append(pool.submit(function, *job))
+        while pending:
+            result = pending.popleft().result()
+            for job in itertools.islice(jobs, 1):
+                pending.append(pool.submit(function, *job))
+            yield result
+
+
+class Progress:
+    """
+    Prints the progress and throughput of a build stage, at most once per `interval` seconds.
+
+    :param tag: Prefix of the printed lines, eg. "[create_data_pkg]".
+    :param total: Number of items of the stage.
+    :param total_bytes: Their size in bytes.
+    """
+    def __init__(self, tag, total, total_bytes, interval=1.0):
+        self.tag = tag
+        self.total = total
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self.done = 0
+        self.done_bytes = 0
+        self.start = time.perf_counter()
+        self.last_print = self.start
+
+    def advance(self, size):
+        self.done += 1
+        self.done_bytes += size
+        now = time.perf_counter()
+        if now - self.last_print >= self.interval and self.done < self.total:
+            self.last_print = now
+            print(f"{self.tag} {self.done}/{self.total} files, {self.done_bytes / 2**20:.1f}/"
+                  f"{self.total_bytes / 2**20:.1f} MB, {self.rate():.1f} MB/s")
+
+    def rate(self):
+        elapsed = time.perf_counter() - self.start
+        return self.done_bytes / 2**20 / elapsed if elapsed else 0.0
+
+    def finish(self, workers):
+        elapsed = time.perf_counter() - self.start
+        print(f"{self.tag} {self.done} files, {self.done_bytes / 2**20:.1f} MB in {elapsed:.2f}s "
+              f"({self.rate():.1f} MB/s, {workers} worker{'s' if workers != 1 else ''})")
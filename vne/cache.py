@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    A thread-safe least recently used cache with hit/miss counters.
+
+    :param name: Name shown in the devMode statistics.
+    :param maxsize: Maximum number of entries kept in the cache.
+    :param max_bytes: Optional memory budget. Requires `sizeof`.
+    :param sizeof: Function returning the size in bytes of a cached value.
+    :param pinned: Optional function returning True for values that can't be evicted
+        right now, eg. sounds that are playing. They are skipped, and the cache can go
+        over its limits while every other entry is pinned.
+    """
+    def __init__(self, name, maxsize=32, max_bytes=None, sizeof=None, pinned=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.pinned = pinned
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Returns the value stored for `key` and marks it as the most recently used one.
+        """
+        with self.lock:
+            try:
+                value = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Stores `value`, evicting the least recently used entries if the cache is full.
+        """
+        size = self.sizeof(value) if self.sizeof else 0
+        with self.lock:
+            self.remove(key)
+            self.entries[key] = value
+            self.sizes[key] = size
+            self.total_bytes += size
+            while len(self.entries) > 1 and (len(self.entries) > self.maxsize or
+                                             (self.max_bytes is not None and self.total_bytes > self.max_bytes)):
+                victim = next((entry for entry in self.entries
+                               if entry != key and not (self.pinned and self.pinned(self.entries[entry]))), None)
+                if victim is None:
+                    break
+                self.remove(victim)
+
+    def remove(self, key):
+        # Called with the lock held.
+        if key in self.entries:
+            del self.entries[key]
+            self.total_bytes -= self.sizes.pop(key)
+
+    def discard_if(self, predicate):
+        """
+        Removes every entry whose key matches `predicate`.
+        """
+        with self.lock:
+            for key in [key for key in self.entries if predicate(key)]:
+                self.remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.sizes.clear()
+            self.total_bytes = 0
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        """
+        Returns a one line summary of the cache usage.
+        """
+        summary = f"{self.name}: {len(self.entries)}/{self.maxsize} entries, {self.hits} hits, {self.misses} misses"
+        if self.max_bytes is not None:
+            summary += f", {self.total_bytes / 2**20:.1f}/{self.max_bytes / 2**20:.0f} MB"
+        return summary
@@ -0,0 +1,390 @@
+import json
+import re
+
+# Header written in front of every compiled command stream. Anything that does
+# not start with it is treated as KAG source (e.g. .kagc files produced by older
+# builds, which only encrypted the raw text).
+MAGIC = b"KAGC"
+FORMAT_VERSION = 3
+
+
+class Script:
+    """
+    A compiled KAG script: a flat list of ``(opcode, args)`` commands where ``args``
+    is a tuple with the already parsed arguments of the command, and the label table
+    mapping every ``@checkpoint`` label to the index of the command that follows it.
+
+    Conditional blocks are resolved to jump targets: ``@if`` holds the index to jump to
+    when its condition is false and ``@else`` the index right after its ``@endif``.
+
+    Scripts compiled from source also keep the line number of every command in `lines`;
+    it isn't stored in .kagc files.
+    """
+    def __init__(self, commands, name="", labels=None, lines=None):
+        self.commands = commands
+        self.name = name
+        self.labels = labels if labels is not None else {}
+        self.lines = lines if lines is not None else []
+
+    def __len__(self):
+        return len(self.commands)
+
+
+def strip_call(arg):
+    """
+    Removes the optional call parentheses and quotes around an argument,
+    eg. ``("system/ui.kag")`` -> ``system/ui.kag``.
+    """
+    arg = arg.strip()
+    if arg.startswith("(") and arg.endswith(")"):
+        arg = arg[1:-1].strip()
+    return arg.strip('"').strip("'")
+
+
+def parse_no_args(arg):
+    return ()
+
+
+def parse_single(arg):
+    return (arg.strip(),)
+
+
+def parse_call(arg):
+    return (strip_call(arg),)
+
+
+def parse_say(arg):
+    """
+    Splits a dialogue line in ``(mode, speaker, dialogue)``. ``mode`` is ``"character"``
+    for ``K: text`` (speaker is a character alias), ``"name"`` for ``Name* text``
+    (speaker is a literal name) and ``"narration"`` for lines without speaker.
+    """
+    if ':' in arg:
+        speaker, dialogue = arg.split(":", 1)
+        return ("character", speaker.strip(), dialogue.strip())
+    if '*' in arg:
+        speaker, dialogue = arg.split("*", 1)
+        return ("name", speaker.strip(), dialogue.strip())
+    return ("narration", "", arg.strip())
+
+
+def parse_scene_call(arg):
+    arg = arg.strip()
+    if arg.startswith("(") and arg.endswith(")"):
+        arg = arg[1:-1].strip()
+    if (arg.startswith('"') and arg.endswith('"')) or (arg.startswith("'") and arg.endswith("'")):
+        arg = arg[1:-1].strip()
+    return (arg,)
+
+
+def parse_splash_screen(arg):
+    return (strip_call(arg) or "splash",)
+
+
+def parse_game_icon(arg):
+    return (strip_call(arg) or "window_icon",)
+
+
+def parse_jump_scene(arg):
+    parts = [p.strip() for p in arg.split("|") if p.strip()]
+    if len(parts) != 1:
+        raise Exception("[ERROR] Extended format in @jump_scene not implemented.")
+    return (parts[0],)
+
+
+def parse_char(arg):
+    if " as " in arg:
+        parts = arg.split(" as ")
+        if len(parts) != 2:
+            raise Exception("[char] Invalid format. Expected: @char alias as \"name\"")
+        return (parts[0].strip(), parts[1].strip().strip('"'))
+    alias = arg.strip()
+    if not alias:
+        raise Exception("[char] Invalid format. Expected: @char alias [as \"name\"]")
+    return (alias, alias)
+
+
+def parse_scene(arg):
+    parts = arg.split("=")
+    if len(parts) != 2:
+        raise Exception("[ERROR] Invalid format in @scene. Expected: @scene alias = \"file\"")
+    return (parts[0].strip(), parts[1].strip().strip('"'))
+
+
+def parse_define(arg):
+    parts = arg.split("=")
+    if len(parts) != 2:
+        raise Exception("[ERROR] Invalid format in @def. Expected: @def alias = \"value\"")
+    return (parts[0].strip(), parts[1].strip().strip('"'))
+
+
+def parse_set(arg):
+    parts = arg.split("=")
+    if len(parts) != 2:
+        raise Exception("[set] Invalid format. Expected: @set variable = \"new value\"")
+    return (parts[0].strip(), parts[1].strip().strip('"'))
+
+
+def parse_set_event(arg):
+    arg = arg.strip()
+    if arg.startswith("(") and arg.endswith(")"):
+        arg = arg[1:-1].strip()
+    parts = arg.split(",")
+    if len(parts) != 2:
+        raise Exception("[Set] Invalid format. Expected: Set(variable, value)")
+    return (parts[0].strip(), parts[1].strip().strip('"'))
+
+
+def parse_rename(arg):
+    parts = arg.split(" as ")
+    if " as " not in arg or len(parts) != 2:
+        raise Exception("[rename] Invalid format. Expected: @rename alias as \"NewName\"")
+    return (parts[0].strip(), parts[1].strip().strip('"'))
+
+
+def parse_sprite(arg):
+    parts = arg.split(" at ")
+    sprite_alias = parts[0].strip()
+    position = parts[1].strip().lower() if len(parts) > 1 else "center"
+    return (sprite_alias, position)
+
+
+def parse_display(arg):
+    arg = arg.strip()
+    if arg.startswith("(") and arg.endswith(")"):
+        arg = arg[1:-1].strip()
+    parts = arg.split(",")
+    if len(parts) != 2:
+        raise Exception("[Display] Invalid format. Expected: @Display(width,height)")
+    try:
+        return (int(parts[0].strip()), int(parts[1].strip()))
+    except ValueError:
+        raise Exception("[Display] The dimensions must be whole numbers.")
+
+
+BUTTON_PATTERN = re.compile(r'^"([^"]+)"\s+event\s+(.+)$')
+
+
+def parse_button(arg):
+    """
+    Parses ``"Label" event <command>``. The event command is tokenized as well, so
+    clicking the button dispatches it without parsing anything.
+    """
+    match = BUTTON_PATTERN.match(arg.strip())
+    if not match:
+        raise Exception('[button] Invalid format. Expected: @button "Label" event <command>.')
+    return (match.group(1), tokenize_action(match.group(2).strip()))
+
+
+def parse_option(arg):
+    match = BUTTON_PATTERN.match(arg.strip())
+    if not match:
+        raise Exception('[choice-button] Invalid format. Expected: @option "Label" event Set(var, test).')
+    action = match.group(2).strip()
+    if not action.startswith("Set"):
+        raise Exception('[choice-button] Invalid event. Expected: @option "Label" event Set(var, test).')
+    return (match.group(1), tokenize_action(action))
+
+
+# Opcode table: maps every command name to the function that parses its argument
+# string. The handlers registered in EventManager receive the resulting tuple.
+ARGUMENT_PARSERS = {
+    # Primitive
+    "say": parse_say,
+    "exit": parse_no_args,
+    "process_scene": parse_scene_call,
+
+    # Importing/Loading & StartUp/init
+    "Load": parse_call,
+    "LoadSystem": parse_no_args,
+    "LoadMainMenu": parse_no_args,
+    "SplashScreen": parse_splash_screen,
+
+    # Scenes Flow
+    "jump_scene": parse_jump_scene,
+    "checkpoint": parse_single,
+    "goto": parse_single,
+
+    # Variable definitions
+    "char": parse_char,
+    "scene": parse_scene,
+    "def": parse_define,
+
+    # Mutations
+    "set": parse_set,
+    "rename": parse_rename,
+
+    # Images
+    "bg": parse_single,
+    "sprite": parse_sprite,
+    "hide": parse_single,
+
+    # Audio
+    "bgm": parse_single,
+    "sfx": parse_single,
+
+    # Configurations
+    "Display": parse_display,
+    "GameTitle": parse_call,
+    "GameIconName": parse_game_icon,
+
+    # Conditional flags
+    "if": parse_single,
+    "else": parse_no_args,
+    "endif": parse_no_args,
+
+    # Menu
+    "menu": parse_no_args,
+    "button": parse_button,
+    "endMenu": parse_no_args,
+
+    # ALIAS (MENU)
+    "choice": parse_no_args,
+    "option": parse_option,
+    "end_choice": parse_no_args,
+
+    # Events
+    "Scene": parse_scene_call,
+    "Set": parse_set_event,
+    "Quit": parse_no_args,
+}
+
+COMMAND_PATTERN = re.compile(r"(\w+)(.*)")
+
+
+def parse_arguments(opcode, arg):
+    parser = ARGUMENT_PARSERS.get(opcode)
+    if parser is None:
+        # Unknown commands keep their raw argument; dispatching them reports the error.
+        return (arg,)
+    return parser(arg)
+
+
+def tokenize(line):
+    """
+    Turns a single script line into an ``(opcode, args)`` command.
+
+    :param line: A stripped, non-comment script line, eg. ``@bg school`` or ``K: Hello!``.
+    :return: A tuple with the command name and the tuple of parsed arguments.
+    """
+    line = line.strip()
+    if line.startswith("@"):
+        stripped = line[1:].strip()
+        match = COMMAND_PATTERN.match(stripped)
+        if match:
+            opcode = match.group(1)
+            arg = match.group(2).strip().lstrip(":").strip()
+        else:
+            opcode = stripped
+            arg = ""
+        return (opcode, parse_arguments(opcode, arg))
+    if ':' in line:
+        opcode, arg = line.split(":", 1)
+        opcode = opcode.strip()
+        if opcode in ARGUMENT_PARSERS:
+            return (opcode, parse_arguments(opcode, arg.strip()))
+    return ("say", parse_say(line))
+
+
+def tokenize_action(action):
+    """
+    Tokenizes the event of a menu button, the ``@`` prefix is optional.
+    """
+    if not action.startswith("@"):
+        action = "@" + action
+    return tokenize(action)
+
+
+def compile_script(content, name=""):
+    """
+    Compiles KAG source into a `Script`, skipping empty lines and ``#`` comments.
+
+    :param content: The source code of the script.
+    :param name: Name used in error messages (usually the script path).
+    :return: The compiled `Script`.
+    """
+    commands = []
+    lines = []
+    labels = {}
+    # Open conditional blocks, as [if index, else index, line number].
+    blocks = []
+    for lineno, line in enumerate(content.splitlines(), start=1):
+        stripped_line = line.strip()
+        if not stripped_line or stripped_line.startswith("#"):
+            continue
+        try:
+            command = tokenize(stripped_line)
+            opcode = command[0]
+            if opcode == "checkpoint":
+                label, = command[1]
+                if label in labels:
+                    raise Exception(f"[checkpoint] Checkpoint '{label}' is already defined.")
+                labels[label] = len(commands) + 1
+            elif opcode == "if":
+                blocks.append([len(commands), None, lineno])
+            elif opcode == "else":
+                if not blocks:
+                    raise Exception("[else] No open if block.")
+                if blocks[-1][1] is not None:
+                    raise Exception("[else] The if block already has an else.")
+                blocks[-1][1] = len(commands)
+                resolve_jump(commands, blocks[-1][0], len(commands) + 1)
+            elif opcode == "endif":
+                if not blocks:
+                    raise Exception("[endif] No open if block.")
+                if_index, else_index, _ = blocks.pop()
+                resolve_jump(commands, if_index if else_index is None else else_index, len(commands) + 1)
+            commands.append(command)
+            lines.append(lineno)
+        except Exception as e:
+            raise Exception(f"[compile] {name or '<script>'}:{lineno}: {e}")
+    if blocks:
+        raise Exception(f"[compile] {name or '<script>'}:{blocks[-1][2]}: [if] The if block is never closed with @endif.")
+    return Script(commands, name, labels, lines)
+
+
+def resolve_jump(commands, index, target):
+    """
+    Appends the jump target to the arguments of the ``@if``/``@else`` command at `index`.
+    """
+    opcode, args = commands[index]
+    commands[index] = (opcode, args + (target,))
+
+
+def dumps(script):
+    """
+    Serializes a compiled `Script` to the binary command stream stored in .kagc files.
+    """
+    payload = {
+        "version": FORMAT_VERSION,
+        "commands": script.commands,
+        "labels": script.labels,
+    }
+    return MAGIC + json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data, name=""):
+    """
+    Loads a command stream produced by `dumps`. Data without the header is compiled
+    as KAG source, so scripts compiled by older versions keep working.
+
+    :param data: The decrypted content of a .kagc file.
+    :param name: Name of the script, used in error messages.
+    :return: The compiled `Script`.
+    """
+    if not data.startswith(MAGIC):
+        return compile_script(data.decode("utf-8", errors="replace"), name)
+    payload = json.loads(data[len(MAGIC):].decode("utf-8"))
+    if payload.get("version") != FORMAT_VERSION:
+        raise Exception(f"[compile] '{name}' was compiled with an unsupported format version ({payload.get('version')}).")
+    commands = [as_tuple(command) for command in payload["commands"]]
+    return Script(commands, name, payload["labels"])
+
+
+def as_tuple(value):
+    """
+    Converts the JSON arrays of a loaded command back into tuples.
+    """
+    if isinstance(value, list):
+        return tuple(as_tuple(item) for item in value)
+    return value
@@ -28,10 +28,48 @@ CONFIG = {
          "border_color": (255, 255, 255)
     },
     "sprite_scale": 0.5,
-    "bgm_channel": 0,
-    "sfx_channel": 1,
     "bgm_volume": 0.6,
-    "sfx_volume": 1.0 
+    "sfx_volume": 1.0,
+    # Sound effects play on a pool of channels; when all of them are busy, the oldest
+    # effect is cut off.
+    "sfx_channels": 8,
+    # Fade out of the playing track when @bgm changes the music.
+    "bgm_fade_out_ms": 500,
+    # Run the commands that don't wait for the player back to back, spending at most
+    # command_budget_ms per frame. Disable to execute one command per frame.
+    "batch_commands": True,
+    "command_budget_ms": 16,
+    # Number of compiled scripts (scenes, system files) kept in memory.
+    "script_cache_size": 32,
+    # Scenes defined with @scene that are loaded in the background at startup. Scenes
+    # referenced by the running script are always prefetched.
+    "prefetch_defined_scenes": 8,
+    # Decode the images and sounds of the next prefetch_lookahead commands on
+    # prefetch_workers background threads.
+    "prefetch_assets": True,
+    "prefetch_lookahead": 32,
+    "prefetch_workers": 2,
+    # Decoded images (and backgrounds scaled to the screen) kept in memory.
+    "image_cache_size": 256,
+    "image_cache_mb": 256,
+    # Decoded sound effects kept in memory. Sounds that are playing are never evicted.
+    "sound_cache_size": 64,
+    "sound_cache_mb": 64,
+    # Log file, relative to the game folder.
+    "log_file": "log.txt",
+    # Minimum level written to log.txt: "debug", "info", "warning" or "error".
+    "log_level": "info",
+    # Log every executed command. Always on in devMode.
+    "trace_commands": False,
+    # Seconds between writes of the buffered log messages.
+    "log_flush_interval": 0.5,
+    # log.txt is rotated to log.1.txt... once it grows past log_max_kb.
+    "log_max_kb": 1024,
+    "log_backups": 2,
+    # Record the time spent in handlers, file reads and drawing. The session is saved
+    # to profile_trace (Chrome trace-event JSON) when the game finishes.
+    "profile": False,
+    "profile_trace": "profile.json"
 }
 
 engine_version = __version__
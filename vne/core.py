@@ -1,6 +1,7 @@
 import pygame
 import os
 import platform
+import time
 from datetime import datetime
 from vne.lexer import ScriptLexer
 from vne.renderer import Renderer
@@ -9,31 +10,79 @@ from vne.config import CONFIG
 from vne.config import key, engine_version
 from vne.rm import ResourceManager
 from vne.aes import AES
+from vne.cache import LRUCache
+from vne.prefetch import ScenePrefetcher, AssetPrefetcher
+from vne.log import Logger, LEVELS, INFO, ERROR
+from vne.profiler import Profiler
+from vne.input import PygameInput, ScriptedInput
+from vne.images import ImageLoader
+from vne.mixer import Mixer
+from vne.Audio import sound_size, sound_playing
 
 class VNEngine:
-    def __init__(self, game_path, devMode=False):
+    def __init__(self, game_path, devMode=False, profile=False, headless=False, input=None, frame_pacing=None, config=None):
+        """
+        :param game_path: The game folder.
+        :param devMode: Shows the runtime statistics and logs every executed command.
+        :param profile: Records a profile of the session, see :class:`vne.profiler.Profiler`.
+        :param headless: Runs without a window or sound card, using SDL's dummy drivers.
+        :param input: Source of the player input. Defaults to the mouse, or to a
+                      :class:`vne.input.ScriptedInput` that always picks the first option when headless.
+        :param frame_pacing: Limits the game to 30 frames per second. Defaults to False when headless.
+        :param config: Values that override the ones in `vne.config.CONFIG` for this engine.
+        """
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
         self.game_path = game_path
+        self.headless = headless
+        self.input = input or (ScriptedInput() if headless else PygameInput())
+        self.frame_pacing = not headless if frame_pacing is None else frame_pacing
         self.running = True
         self.current_bg = None
         self.sprites = {}
         self.current_dialogue = ""
+        self.dialogue_page = 0
         self.current_menu = None
         self.menu_selection = 0
         self.loaded_files = {}
         self.characters = {}
         self.scenes = {}
         self.vars = {}
-        self.config = CONFIG
+        self.config = dict(CONFIG, **config) if config else CONFIG
         self.devMode = devMode
         self.checkpoints = {}
-        self.condition_stack = []
         self.current_menu_buttons = []
         self.typewriter_index = 0
+        self.logger = Logger(
+            os.path.join(self.game_path, self.config.get("log_file", "log.txt")),
+            LEVELS.get(self.config.get("log_level", "info"), INFO),
+            self.devMode or self.config.get("trace_commands", False),
+            self.config.get("log_flush_interval", 0.5),
+            self.config.get("log_max_kb", 1024) * 1024,
+            self.config.get("log_backups", 2)
+        )
+        self.logger.begin(self.log_header())
+        self.profiler = Profiler(profile or self.config.get("profile", False))
  
         
-        self.resource_manager = ResourceManager(self.game_path, self.Log)
+        self.resource_manager = ResourceManager(self.game_path, self.Log, self.profiler, watch=self.devMode)
+        self.script_cache = LRUCache("scripts", self.config.get("script_cache_size", 32))
         self.lexer = ScriptLexer(self.game_path, self)
+        # Lexers of the scripts waiting for an @Load-ed script to finish, innermost last.
+        self.lexer_stack = []
         self.event_manager = EventManager()
+        self.prefetcher = ScenePrefetcher(self)
+        self.assets = AssetPrefetcher(self)
+        self.images = ImageLoader(self)
+        self.mixer = Mixer(self)
+        self.sounds = LRUCache(
+            "sounds",
+            self.config.get("sound_cache_size", 64),
+            self.config.get("sound_cache_mb", 64) * 2**20,
+            sound_size,
+            sound_playing
+        )
         self.renderer = Renderer(self)
         self.clock = pygame.time.Clock()
  
@@ -54,32 +103,83 @@ class VNEngine:
         """
         waiting = True
         while waiting and self.running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                    return
-                
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    waiting = False
-                
-                               
+            waiting = not self.input.poll_advance(self)
+            if not self.running:
+                return
             self.renderer.render()
          
-    def Log(self, log, _=None):
+    def Log(self, log, level=INFO):
         """
-        The function `Log` appends a log message to a file named 'log.txt'.
+        The function `Log` appends a log message to the file named 'log.txt'. Messages are
+        buffered and written by a background thread, see :class:`vne.log.Logger`.
         
-        :param log: The `Log` function takes a parameter `log`, which is a string representing the log
-        message that you want to write to a file named `log.txt`. The function appends the log message to
-        the file
+        :param log: The log message.
+        :param level: One of the levels in `vne.log`, INFO by default.
         """
-        log_path = os.path.join(self.game_path, 'log.txt')
-        
-        with open(log_path, 'a+') as f:
-            f.write("\n")
-            f.write(log)
-            f.close()
+        self.logger.log(log, level)
+
+    def log_header(self):
+        init_log_template = """created at: %(createdAt)s
+Plataform: %(plataform)s
+VNE %(engineVersion)s
+"""
+        init_log_template_data = {
+            'createdAt': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'plataform': f"{platform.system()}-{platform.version()}",
+            'engineVersion': engine_version 
+        }
+        return init_log_template % init_log_template_data
     
+    def dev_stats(self):
+        """
+        Returns the lines of runtime statistics shown in devMode.
+        """
+        stats = [
+            self.script_cache.stats(),
+            self.prefetcher.stats(),
+            self.assets.stats(),
+            self.images.stats(),
+            self.sounds.stats()
+        ]
+        if self.profiler.enabled:
+            stats.append(self.profiler.frame_stats())
+        return stats
+
+    def save_profile(self):
+        """
+        Writes the profiler report to the log and the recorded session to the file set in
+        `profile_trace`, in the Chrome trace-event format.
+        """
+        trace_path = os.path.join(self.game_path, self.config.get("profile_trace", "profile.json"))
+        try:
+            self.profiler.export_chrome_trace(trace_path)
+            self.Log(f"[profiler] Trace saved to '{trace_path}'.\n{self.profiler.report()}")
+        except Exception as e:
+            self.Log(f"[profiler] Error saving the trace to '{trace_path}': {e}", ERROR)
+
+    def execute_commands(self):
+        """
+        Executes the script commands of one frame. With `batch_commands` enabled, commands
+        run back to back until one of them yields to the player (dialogue, menus, splash
+        screens) or `command_budget_ms` is spent; otherwise a single command is executed.
+        """
+        batch = self.config.get("batch_commands", True)
+        budget = self.config.get("command_budget_ms", 16) / 1000.0
+        frame_start = time.perf_counter()
+        while self.running:
+            self.assets.scan()
+            command = self.lexer.get_next_command()
+            if command is None:
+                if self.frame_pacing:
+                    pygame.time.wait(2000)
+                self.running = False
+                return
+            self.event_manager.handle(command, self)
+            if not batch or self.event_manager.yields(command):
+                return
+            if time.perf_counter() - frame_start >= budget:
+                return
+
     def run(self):
         """
         This Python function runs a game by loading a script, handling events, and updating the display
@@ -94,22 +194,6 @@ class VNEngine:
      
         self.Log("Running game. Close the window to exit.") 
 
-        init_log_template = """created at: %(createdAt)s
-Plataform: %(plataform)s
-VNE %(engineVersion)s
-"""
-        init_log_template_data = {
-            'createdAt': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'plataform': f"{platform.system()}-{platform.version()}",
-            'engineVersion': engine_version 
-        }
-
-        log_path = os.path.join(self.game_path, 'log.txt')
-
-        with open(log_path, 'w') as f:
-            f.write(init_log_template % init_log_template_data)
-            pass
-
         candidates = [
             "startup.kagc",
             "startup.kag"
@@ -120,16 +204,16 @@ VNE %(engineVersion)s
         
  
         for candidate in candidates:
-            try:
-                data_bytes = self.resource_manager.get_bytes(candidate)
-                if candidate.endswith(".kagc"):
-                    content = AES(data_bytes, key).decrypt().decode("utf-8", errors="replace")
-                else:
-                    content = data_bytes
-                self.Log(f"[VNEngine] Startup script loaded: {candidate}")
-                break
-            except FileNotFoundError:
+            if self.resource_manager.resolve(candidate) != candidate:
                 continue
+            data_bytes = self.resource_manager.get_bytes(candidate)
+            if candidate.endswith(".kagc"):
+                with self.profiler.span("aes_decrypt", candidate):
+                    content = AES(data_bytes, key).decrypt().decode("utf-8", errors="replace")
+            else:
+                content = data_bytes
+            self.Log(f"[VNEngine] Startup script loaded: {candidate}")
+            break
 
         if content is None:
             self.Log("[VNEngine] Startup script not found. Exiting.")
@@ -139,46 +223,49 @@ VNE %(engineVersion)s
         self.renderer.initialize()
  
         while self.running:
-            delta_time = self.clock.tick(30) / 1000.0
+            delta_time = self.clock.tick(30 if self.frame_pacing else 0) / 1000.0
+            self.mixer.update()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.running = False
             
             self.typewriter_index += int(delta_time * 20)
-            command = self.lexer.get_next_command()
-            if command is None:
-                pygame.time.wait(2000)
+            try:
+                self.execute_commands()
+            except Exception as e:
                 self.running = False
-            else:
-                try:
-                    self.event_manager.handle(command, self)
-                    pass
-                except Exception as e:
-                    self.running = False
-                    traceback_template = '''Exception error:
+                traceback_template = '''Exception error:
   %(message)s\n
 
   %(plataform)s
   VNE %(engineVersion)s
   '''
-                    self.Log(f"[Exception] Script was failed. Check the traceback.txt file for more information.")
-                    
-                    traceback_details = {
-                        'message' : e,
-                        'plataform': f"{platform.system()}-{platform.version()}",
-                        'engineVersion': engine_version 
-                    }
-                    
-                    print(traceback_template % traceback_details)
+                self.Log(f"[Exception] Script was failed. Check the traceback.txt file for more information.", ERROR)
+                
+                traceback_details = {
+                    'message' : e,
+                    'plataform': f"{platform.system()}-{platform.version()}",
+                    'engineVersion': engine_version 
+                }
+                
+                print(traceback_template % traceback_details)
 
-                    trace_path = os.path.join(self.game_path, 'traceback.txt')
+                trace_path = os.path.join(self.game_path, 'traceback.txt')
 
 
-                    with open(trace_path, 'w') as f:
-                        f.write(traceback_template % traceback_details)
-                        f.close()
+                with open(trace_path, 'w') as f:
+                    f.write(traceback_template % traceback_details)
+                    f.close()
   
           
             pygame.display.update()
-        pygame.quit()
+        self.prefetcher.stop()
+        self.assets.stop()
+        if self.devMode:
+            for line in (self.assets.stats(), self.images.stats(), self.sounds.stats()):
+                self.Log(f"[VNEngine] {line}")
+        if self.profiler.enabled:
+            self.save_profile()
         self.Log("Game finished.")
+        self.logger.close()
+        pygame.quit()
@@ -1,12 +1,12 @@
 import io
 import os
+import zlib
 import pygame
  
 from collections import ChainMap
 import re
 from vne.lexer import ScriptLexer
-from vne.aes import AES
-from vne.config import key
+from vne.compiler import tokenize, compile_script
 import pickle
 from vne.Audio import Audio
 
@@ -20,6 +20,13 @@ class EventManager:
             "ui.kag",
             "scenes.kag"
         ]
+        # Commands that hand control to the player, the frame ends after them.
+        self.yielding_events = {
+            "say",
+            "SplashScreen",
+            "endMenu",
+            "end_choice"
+        }
  
 
     def register_default_events(self):
@@ -96,47 +103,36 @@ class EventManager:
     
     def handle(self, command, engine=None):
         """
-        Processes a command by extracting the event name and argument,
-        then dispatching the event to the appropriate handler.
-        """
-        command = command.strip()
-         
-        if command.startswith("@"):
-            stripped = command[1:].strip()
-            match = re.match(r"(\w+)(.*)", stripped)
-            if match:
-                event_name = match.group(1)
-                arg = match.group(2).strip()
-                arg = arg.lstrip(":").strip()
-            else:
-                event_name = stripped
-                arg = ""
-            self.dispatch(event_name, arg, engine)
-        elif ':' in command:
-            event_name, arg = command.split(":", 1)
-            event_name = event_name.strip()
-            arg = arg.strip()
-            if event_name in self.event_handlers:
-                self.dispatch(event_name, arg, engine)
-            else:
-                self.handle_say(command, engine)
-        else:
-            self.dispatch("say", command.strip(), engine)
+        Processes a command and dispatches it to the appropriate handler. Commands
+        are the ``(opcode, args)`` tuples produced by the compiler; raw script lines
+        are still accepted and tokenized on the fly.
+        """
+        if isinstance(command, str):
+            command = tokenize(command)
+        event_name, args = command
+        self.dispatch(event_name, args, engine)
     
-    def dispatch(self, event_name, arg, engine=None):
+    def yields(self, command):
         """
-        Calls the corresponding event handlers with the provided argument and engine.
+        Returns True if the command waits for the player, so the engine should
+        render a frame before executing the next one.
+        """
+        return command[0] in self.yielding_events
+
+    def dispatch(self, event_name, args, engine=None):
+        """
+        Calls the corresponding event handlers with the already parsed arguments and engine.
         """
-        control_commands = {"if", "else", "endif", "checkpoint", "goto"}
-        if event_name not in control_commands:
-            if hasattr(engine, "condition_stack") and engine.condition_stack:
-                if not all(engine.condition_stack):
-                    return
         handlers = self.event_handlers.get(event_name, [])
         if not handlers:
             raise Exception(f"[ERROR] No handlers for event '{event_name}'.")
+        profiler = engine.profiler if engine is not None else None
         for handler in handlers:
-            handler(arg, engine)
+            if profiler is not None and profiler.enabled:
+                with profiler.span("dispatch:" + event_name):
+                    handler(args, engine)
+            else:
+                handler(args, engine)
 
     def substitute_variables(self, text, engine):
         mapping = ChainMap(engine.characters, engine.scenes, engine.vars)
@@ -145,14 +141,12 @@ class EventManager:
             return str(mapping.get(key, match.group(0)))
         return re.sub(r'\{([^}]+)\}', replacer, text)
     
-    def handle_say(self, arg, engine):
+    def handle_say(self, args, engine):
         """
         Processes dialogue for characters, replacing variables with their corresponding values before waiting for user input.
         """
-        if ':' in arg:
-            speaker, dialogue = arg.split(":", 1)
-            speaker = speaker.strip()
-            dialogue = dialogue.strip()
+        mode, speaker, dialogue = args
+        if mode == "character":
             if speaker not in engine.characters:
                 raise Exception(f"[ERROR] The character '{speaker}' is not defined.")
             engine.current_character_name = engine.characters[speaker]
@@ -169,12 +163,7 @@ class EventManager:
             dialogue = re.sub(r"\{([^}]+)\}", replacer, dialogue)
             engine.current_dialogue = dialogue
         
-        elif '*' in arg:
-       
-            speaker, dialogue = arg.split("*", 1)
-            speaker = speaker.strip()
-            dialogue = dialogue.strip()
-            
+        elif mode == "name":
             engine.current_character_name = speaker
             def replacer(match):
                 key = match.group(1).strip()
@@ -189,7 +178,7 @@ class EventManager:
             dialogue = re.sub(r"\{([^}]+)\}", replacer, dialogue)
             engine.current_dialogue = dialogue
         else:
-            engine.current_dialogue = arg.strip()
+            engine.current_dialogue = dialogue
             engine.current_character_name = ""
             def replacer(match):
                 key = match.group(1).strip()
@@ -202,40 +191,34 @@ class EventManager:
                 else:
                     raise Exception(f"[ERROR] The variable for '{key}' is not defined.")
             engine.current_dialogue = re.sub(r"\{([^}]+)\}", replacer, engine.current_dialogue)
-        engine.wait_for_keypress()
+        # Dialogue that doesn't fit the dialogue box is shown one page per click.
+        for page in range(len(engine.renderer.dialogue_pages(engine.current_dialogue))):
+            engine.dialogue_page = page
+            engine.wait_for_keypress()
+            if not engine.running:
+                break
+        engine.dialogue_page = 0
         engine.current_dialogue = ""
         engine.current_character_name = ""
     
-    def handle_bg(self, arg, engine):
+    def handle_bg(self, args, engine):
         """
         Loads and scales a background image.
         """
-        load_image = ScriptLexer(engine.game_path, engine).load_image
-        relative_path = os.path.join("images", "bg", arg + ".jpg")
+        name, = args
+        relative_path = os.path.join("images", "bg", name + ".jpg")
         try:
-            bg_image = load_image(relative_path)
-            bg_image = pygame.transform.scale(bg_image, (engine.renderer.screen.get_width(),
-                                                         engine.renderer.screen.get_height()))
-            engine.current_bg = bg_image
+            engine.current_bg = engine.images.load_scaled(relative_path, engine.renderer.screen.get_size())
         except Exception as e:
             raise Exception(f"[bg] Error loading background image: {e}")
     
-    def handle_splash_screen(self, arg, engine):
-        arg = arg.strip()
-        if arg.startswith("(") and arg.endswith(")"):
-            arg = arg[1:-1].strip()
-        arg = arg.strip('"').strip("'")
+    def handle_splash_screen(self, args, engine):
+        name, = args
 
-        if not arg:
-            arg = "splash"
-
-        load_image = ScriptLexer(engine.game_path, engine).load_image
-        relative_path = os.path.join("ui", arg + ".jpg")
+        relative_path = os.path.join("ui", name + ".jpg")
 
         try:
-            bg_image = load_image(relative_path)
-            bg_image = pygame.transform.scale(bg_image, (engine.renderer.screen.get_width(),
-                                                         engine.renderer.screen.get_height()))
+            bg_image = engine.images.load_scaled(relative_path, engine.renderer.screen.get_size())
     
         except Exception as e:
             raise Exception(f"[bg] Error loading splash image: {e}")
@@ -243,29 +226,26 @@ class EventManager:
         engine.renderer.screen.blit(bg_image, (0, 0))
         pygame.display.flip()
 
-         
-        splash_duration = 2000   
+        # Headless runs and runs without frame pacing don't wait for the splash.
+        if engine.headless or not engine.frame_pacing:
+            return
+        splash_duration = 2000
         start_time = pygame.time.get_ticks()
         while engine.running and pygame.time.get_ticks() - start_time < splash_duration:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    engine.running = False
-                    return
-             
-                if event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
-                    return
+            engine.profiler.frame()
+            if engine.input.poll_skip(engine):
+                return
+            engine.mixer.update()
+            engine.clock.tick(30)
      
-    def handle_sprite(self, arg, engine):
+    def handle_sprite(self, args, engine):
         """
         Loads and stores a sprite image with a specified alias and position.
         """
-        load_image = ScriptLexer(engine.game_path, engine).load_image
-        parts = arg.split(" at ")
-        sprite_alias = parts[0].strip()
-        position = parts[1].strip().lower() if len(parts) > 1 else "center"
+        sprite_alias, position = args
         relative_path = os.path.join("images", "sprites", sprite_alias + ".png")
         try:
-            sprite_image = load_image(relative_path)
+            sprite_image = engine.images.load(relative_path)
         except Exception as e:
             raise Exception(f"[sprite] {e}")
         if not hasattr(engine, "sprites"):
@@ -273,32 +253,29 @@ class EventManager:
         engine.sprites[sprite_alias] = {"image": sprite_image, "position": position}
         engine.Log(f"[sprite] Sprite '{sprite_alias}' displayed at position '{position}'.")
     
-    def handle_hide_sprite(self, arg, engine):
+    def handle_hide_sprite(self, args, engine):
         """
         Hides a sprite by removing it from the engine's sprite dictionary.
         """
-        sprite_alias = arg.strip()
+        sprite_alias, = args
         if hasattr(engine, "sprites") and sprite_alias in engine.sprites:
             del engine.sprites[sprite_alias]
             engine.Log(f"[hide] Sprite '{sprite_alias}' hidden.")
         else:
             engine.Log(f"[hide] Sprite '{sprite_alias}' not found to hide.")
     
-    def handle_exit(self, arg, engine):
+    def handle_exit(self, args, engine):
         """
         Prints a message and stops the engine.
         """
-        engine.Log("Event 'exit'", arg)
+        engine.Log("Event 'exit'")
         engine.running = False
     
-    def handle_Load(self, arg, engine):
+    def handle_Load(self, args, engine):
         """
         Loads and processes KAG/KAGC files.
         """
-        arg = arg.strip()
-        if arg.startswith("(") and arg.endswith(")"):
-            arg = arg[1:-1].strip()
-        arg = arg.strip('"').strip("'")
+        arg, = args
         force_compiled = any(keyword in arg.lower() for keyword in self.system_files)
         try:
             if force_compiled:
@@ -306,175 +283,142 @@ class EventManager:
                     compiled_arg = arg[:-4] + ".kagc"
                 else:
                     compiled_arg = arg
-                data = engine.resource_manager.get_bytes(compiled_arg)
-                data = AES(data, key).decrypt().decode("utf-8", errors="replace")
+                script = self.load_script(compiled_arg, engine)
                 engine.Log(f"[Load] Compiled file loaded: {compiled_arg}")
-                engine.loaded_files[compiled_arg] = data
-                content = data
+                engine.loaded_files[compiled_arg] = script
 
             else:
                 data = engine.resource_manager.get_bytes(arg)
+                content = data.decode("utf-8", errors="replace")
                 engine.Log(f"[Load] File loaded: {arg}")
-                engine.loaded_files[arg] = data
-                content = data
-            if any(line.strip().startswith("@") for line in content.splitlines()):
-                commands = ScriptLexer(engine.game_path, engine).parse_script(content)
-                for cmd in commands:
-                    engine.Log(f"[Load-Process] Executing command: {cmd}")
-                    self.handle(cmd, engine)
+                engine.loaded_files[arg] = content
+                if not any(line.strip().startswith("@") for line in content.splitlines()):
+                    return
+                script = compile_script(content, arg)
+            self.execute_script(script, engine)
         except Exception as e:
             raise Exception(f"[Load] Error loading {arg}: {e}")
     
-    def handle_load_system(self, arg, engine):
+    def execute_script(self, script, engine):
+        """
+        Runs a script to completion through its own lexer, so jumps (@if, @goto) move
+        inside that script. Stops early if a command switches to another script.
+        """
+        previous_lexer = engine.lexer
+        lexer = ScriptLexer(engine.game_path, engine, script)
+        engine.lexer = lexer
+        engine.lexer_stack.append(previous_lexer)
+        engine.prefetcher.prefetch_references(script)
+        try:
+            while engine.lexer is lexer and engine.running:
+                command = lexer.get_next_command()
+                if command is None:
+                    break
+                self.handle(command, engine)
+        finally:
+            engine.lexer_stack.pop()
+            if engine.lexer is lexer:
+                engine.lexer = previous_lexer
+
+    def handle_load_system(self, args, engine):
         for file in self.system_files:
-            self.handle_Load(f'("system/{file}")', engine)
+            self.handle_Load((f"system/{file}",), engine)
     
-    def handle_load_main_menu(self, arg, engine):
+    def handle_load_main_menu(self, args, engine):
         if not "main_menu.kag" in self.system_files:
             self.system_files.append("main_menu.kag")
-        self.handle_Load('("system/main_menu.kag")', engine)
+        self.handle_Load(("system/main_menu.kag",), engine)
     
-    def handle_scene(self, arg, engine):
+    def handle_scene(self, args, engine):
         """
-        Parses and stores scene aliases and filenames.
+        Stores scene aliases and filenames.
         """
-        parts = arg.split("=")
-        if len(parts) == 2:
-            alias = parts[0].strip()
-            filename = parts[1].strip().strip('"')
-            engine.scenes[alias] = filename
-            engine.Log(f"[scene] Scene defined: alias '{alias}', file '{filename}'")
-        else:
-            raise Exception("[ERROR] Invalid format in @scene. Expected: @scene alias = \"file\"")
+        alias, filename = args
+        engine.scenes[alias] = filename
+        engine.Log(f"[scene] Scene defined: alias '{alias}', file '{filename}'")
+        if len(engine.scenes) <= engine.config.get("prefetch_defined_scenes", 8):
+            engine.prefetcher.prefetch(self.scene_path(alias, engine))
         
-    def handle_define(self, arg, engine):
+    def handle_define(self, args, engine):
         """
-        Parses and stores variable definitions.
+        Stores variable definitions.
         """
-        parts = arg.split("=")
-        if len(parts) == 2:
-            alias = parts[0].strip()
-            var = parts[1].strip().strip('"')
-            string_var = self.substitute_variables(var, engine)
+        alias, var = args
+        string_var = self.substitute_variables(var, engine)
 
-            engine.vars[alias] = string_var
-            engine.Log(f"[variable] Variable defined: alias '{alias}', file '{string_var}'")
-        else:
-            raise Exception("[ERROR] Invalid format in @def. Expected: @def alias = \"value\"")
+        engine.vars[alias] = string_var
+        engine.Log(f"[variable] Variable defined: alias '{alias}', file '{string_var}'")
     
-    def handle_process_scene(self, arg, engine):
-        """
-        Processes a scene by loading and parsing a script file based on the scene alias.
-        """
-        arg = arg.strip()
-        if arg.startswith("(") and arg.endswith(")"):
-            arg = arg[1:-1].strip()
-        if (arg.startswith('"') and arg.endswith('"')) or (arg.startswith("'") and arg.endswith("'")):
-            arg = arg[1:-1].strip()
-        scene_alias = arg
-        if scene_alias in engine.scenes:
-            filename = engine.scenes[scene_alias]
-        else:
-            filename = scene_alias
-        base_name = os.path.join("scenes", filename)
+    def handle_process_scene(self, args, engine):
+        """
+        Processes a scene by loading a compiled script file based on the scene alias.
+        """
+        scene_alias, = args
+        compiled_path = self.scene_path(scene_alias, engine)
         try:
-            compiled_path = base_name + ".kagc"
-            file_bytes = engine.resource_manager.get_bytes(compiled_path)
-            content = AES(file_bytes, key).decrypt().decode("utf-8", errors="replace")
+            engine.prefetcher.wait(compiled_path)
+            script = self.load_script(compiled_path, engine)
 
         except Exception as e:
-            raise Exception(f"[ERROR] Compiled version of the script for '{base_name}' not found: {e}")
+            raise Exception(f"[ERROR] Compiled version of the script for '{compiled_path[:-5]}' not found: {e}")
         engine.Log(f"[process_scene] Processing scene '{scene_alias}'.")
-        new_lexer = ScriptLexer(engine.game_path, engine)
-        new_lexer.commands = new_lexer.parse_script(content)
-        new_lexer.original_commands = list(new_lexer.commands)
-        new_lexer.current = 0
-        engine.lexer = new_lexer
+        engine.lexer = ScriptLexer(engine.game_path, engine, script)
+        engine.prefetcher.prefetch_references(script)
         engine.Log(f"[process_scene] New scene loaded with {len(engine.lexer.commands)} commands.")
     
-    def handle_jump_scene(self, arg, engine):
+    def scene_path(self, scene_alias, engine):
+        """
+        Returns the path of the compiled script of a scene alias (or file name).
+        """
+        filename = engine.scenes.get(scene_alias, scene_alias)
+        return os.path.join("scenes", filename + ".kagc")
+
+    def handle_jump_scene(self, args, engine):
         """
         Processes the scene jump command.
         """
-        parts = [p.strip() for p in arg.split("|") if p.strip()]
-        if len(parts) != 1:
-            raise Exception("[ERROR] Extended format in @jump_scene not implemented.")
-        scene_alias = parts[0]
-        if scene_alias in engine.scenes:
-            scene_file_name = engine.scenes[scene_alias]
-        else:
-            scene_file_name = scene_alias
-        compiled_path = os.path.join("scenes", f"{scene_file_name}.kagc")
-        content = ""
+        scene_alias, = args
+        compiled_path = self.scene_path(scene_alias, engine)
         try:
-            file_bytes = engine.resource_manager.get_bytes(compiled_path)
-            content = AES(file_bytes, key).decrypt().decode("utf-8", errors="replace")
+            engine.prefetcher.wait(compiled_path)
+            script = self.load_script(compiled_path, engine)
             engine.Log(f"[jump_scene] Compiled scene '{scene_alias}' loaded from: {compiled_path}")
         except Exception as e:
-            non_compiled_path = os.path.join(engine.game_path, "data", "scenes", f"{scene_file_name}.kag")
+            non_compiled_path = compiled_path[:-1]
             try:
-                with open(non_compiled_path, "r", encoding="utf-8") as f:
-                    content = f.read()
+                script = self.load_script(non_compiled_path, engine)
                 engine.Log(f"[jump_scene] Uncompiled scene '{scene_alias}' loaded from: {non_compiled_path}")
             except Exception as e2:
                 raise Exception(f"[jump_scene] Error loading scene '{scene_alias}': {e2}")
-        new_lexer = ScriptLexer(engine.game_path, engine)
-        new_lexer.commands = new_lexer.parse_script(content)
-        new_lexer.original_commands = list(new_lexer.commands)
-        new_lexer.current = 0
-        engine.lexer = new_lexer
+        engine.lexer = ScriptLexer(engine.game_path, engine, script)
+        engine.prefetcher.prefetch_references(script)
         engine.Log(f"[jump_scene] New scene loaded with {len(engine.lexer.commands)} commands.")
         engine.Log(f"[jump_scene] Jumping to scene '{scene_alias}'.")
     
-    def handle_char(self, arg, engine):
+    def handle_char(self, args, engine):
         """
         Defines character aliases and display names.
         """
-        parts = arg.split(" as ")
-        alias = arg.strip()
-        if " as " in arg:
-            if len(parts) == 2:
-                alias = parts[0].strip()
-                display_name = parts[1].strip().strip('"')
-                engine.characters[alias] = display_name
-                engine.Log(f"[char] Character defined: alias '{alias}', name '{display_name}'")
-            else:
-                raise Exception("[char] Invalid format. Expected: @char alias as \"name\"")
-        else:
-            if alias:
-                engine.characters[alias] = alias
-                engine.Log(f"[char] Character defined: alias '{alias}', name '{alias}'")
-            else:
-                raise Exception("[char] Invalid format. Expected: @char alias [as \"name\"]")
+        alias, display_name = args
+        engine.characters[alias] = display_name
+        engine.Log(f"[char] Character defined: alias '{alias}', name '{display_name}'")
     
-    def handle_rename(self, arg, engine):
+    def handle_rename(self, args, engine):
         """
         Renames a character based on the provided alias and new display name.
         """
-        if " as " in arg:
-            parts = arg.split(" as ")
-            if len(parts) == 2:
-                alias = parts[0].strip()
-                new_display_name = parts[1].strip().strip('"')
-                if alias not in engine.characters:
-                    raise Exception(f"[rename] Character '{alias}' is not defined, cannot rename.")
-                engine.characters[alias] = new_display_name
-                engine.Log(f"[rename] Character '{alias}' renamed to '{new_display_name}'.")
-            else:
-                raise Exception("[rename] Invalid format. Expected: @rename alias as \"NewName\"")
-        else:
-            raise Exception("[rename] Invalid format. Expected: @rename alias as \"NewName\"")
+        alias, new_display_name = args
+        if alias not in engine.characters:
+            raise Exception(f"[rename] Character '{alias}' is not defined, cannot rename.")
+        engine.characters[alias] = new_display_name
+        engine.Log(f"[rename] Character '{alias}' renamed to '{new_display_name}'.")
     
-    def handle_set(self, arg, engine):
+    def handle_set(self, args, engine):
         """
         Updates the value of an already defined variable.
         Syntax: @set variable = "new value".
         """
-        parts = arg.split("=")
-        if len(parts) != 2:
-            raise Exception("[set] Invalid format. Expected: @set variable = \"new value\"")
-        var_name = parts[0].strip()
-        new_value = parts[1].strip().strip('"')
+        var_name, new_value = args
 
         if var_name in engine.characters:
             raise Exception(f"[set] The variable '{var_name}' cannot be modified as it is an already defined character!")
@@ -491,127 +435,130 @@ class EventManager:
         engine.vars[var_name] = new_value
         engine.Log(f"[set] Variable '{var_name}' updated to '{new_value}'.")
     
-    def handle_if(self, arg, engine):
+    def handle_if(self, args, engine):
         """
-        Evaluates the condition and marks the beginning of a conditional block.
+        Evaluates the condition of a conditional block. When it is false the lexer jumps
+        straight to the @else branch (or past the @endif) resolved at compile time.
         """
-        var_name = arg.strip()
-        if not hasattr(engine, "condition_stack"):
-            engine.condition_stack = []
+        var_name, false_target = args
         if var_name in engine.vars:
             value = engine.vars[var_name].lower()
             condition = (value == "true")
         else:
             condition = False
-        engine.condition_stack.append(condition)
+        if not condition:
+            engine.lexer.seek(false_target)
         engine.Log(f"[if] Evaluation of '{var_name}': {condition}")
     
-    def handle_else(self, arg, engine):
+    def handle_else(self, args, engine):
         """
-        Reverses the condition in the current conditional block.
+        Reached at the end of a true @if branch, jumps past the matching @endif.
         """
-        if not hasattr(engine, "condition_stack") or not engine.condition_stack:
-            raise Exception("[else] No open if block.")
-        current = engine.condition_stack.pop()
-        engine.condition_stack.append(not current)
-        engine.Log(f"[else] Condition reversed: now {not current}")
+        endif_target, = args
+        engine.lexer.seek(endif_target)
+        engine.Log("[else] Skipping else branch.")
     
-    def handle_endif(self, arg, engine):
+    def handle_endif(self, args, engine):
         """
         Closes the current conditional block.
         """
-        if not hasattr(engine, "condition_stack") or not engine.condition_stack:
-            raise Exception("[endif] No open if block.")
-        engine.condition_stack.pop()
         engine.Log("[endif] End of if block.")
     
-    def handle_checkpoint(self, arg, engine):
+    def handle_checkpoint(self, args, engine):
         """
-        Saves a checkpoint with a label and the current script line.
+        Saves a checkpoint with a label and the position of the next command in the current script.
         """
-        label = arg.strip()
+        label, = args
         if not hasattr(engine, "checkpoints"):
             engine.checkpoints = {}
-        if engine.lexer.current < len(engine.lexer.original_commands):
-            checkpoint_line = engine.lexer.original_commands[engine.lexer.current]
-        else:
-            checkpoint_line = engine.lexer.original_commands[-1]
-        engine.checkpoints[label] = checkpoint_line
-        engine.Log(f"[checkpoint] Checkpoint '{label}' saved with line: {checkpoint_line}")
+        engine.checkpoints[label] = (engine.lexer.name, engine.lexer.current)
+        engine.Log(f"[checkpoint] Checkpoint '{label}' saved at command {engine.lexer.current} of '{engine.lexer.name}'")
     
-    def handle_goto(self, arg, engine):
-        """
-        Jumps to a specific checkpoint in the script based on the given label.
-        """
-        label = arg.strip()
-        if not hasattr(engine, "checkpoints") or label not in engine.checkpoints:
+    def handle_goto(self, args, engine):
+        """
+        Jumps to a specific checkpoint in the script based on the given label. Labels of the
+        current script are resolved with its label table, so checkpoints further down the script
+        work too; checkpoints reached in another script load that script again.
+        """
+        label, = args
+        if label in engine.lexer.labels:
+            index = engine.lexer.labels[label]
+        elif label in getattr(engine, "checkpoints", {}):
+            script_name, index = engine.checkpoints[label]
+            engine.lexer.load_script(self.load_script(script_name, engine))
+        else:
             raise Exception(f"[goto] Checkpoint '{label}' does not exist.")
-        checkpoint_line = engine.checkpoints[label]
-        engine.Log(f"[goto] Searching for checkpoint line: '{checkpoint_line}'")
-        found_index = None
-        for i, cmd in enumerate(engine.lexer.original_commands):
-            if cmd.strip() == checkpoint_line.strip():
-                found_index = i
-                break
-        if found_index is None:
-            raise Exception(f"[goto] Checkpoint line '{checkpoint_line}' not found in the original script.")
-        engine.lexer.commands = engine.lexer.original_commands[found_index:]
-        engine.lexer.current = 0
-        engine.Log(f"[goto] Jumping to checkpoint '{label}' in the original script starting at index {found_index}.")
+        engine.lexer.seek(index)
+        engine.Log(f"[goto] Jumping to checkpoint '{label}' at command {index} of '{engine.lexer.name}'.")
+
+    def script_key(self, path, engine):
+        """
+        Returns the path `load_script` reads for `path` and its content hash, the key of
+        the script in `engine.script_cache`. The hash is None when the file isn't indexed.
+        """
+        # A .kag path may resolve to its compiled .kagc file.
+        path = engine.resource_manager.resolve(path) or path
+        return path, engine.resource_manager.content_hash(path)
+
+    def load_script(self, path, engine):
+        """
+        Reads a script through the resource manager and returns it compiled. .kagc files
+        are decrypted, any other file is compiled from source. Compiled scripts are kept
+        in `engine.script_cache`, keyed by path and content hash, so entering a scene
+        again skips reading, decrypting and parsing it.
+        """
+        path, version = self.script_key(path, engine)
+        data = None
+        if version is None:
+            # Not in the index: read it once and key it by the CRC of what was read.
+            data = engine.resource_manager.get_bytes(path)
+            version = zlib.crc32(data)
+        cache_key = (path, version)
+        script = engine.script_cache.get(cache_key)
+        if script is not None:
+            return script
+        if data is None:
+            data = engine.resource_manager.get_bytes(path)
+        if path.lower().endswith(".kagc"):
+            script = engine.lexer.load_compiled(data, path)
+        else:
+            script = compile_script(data.decode("utf-8", errors="replace"), path)
+        engine.script_cache.put(cache_key, script)
+        return script
 
-    def handle_game_title(self, arg, engine):
+    def handle_game_title(self, args, engine):
         """
-        The function `handle_game_title` trims and sets the game title for a Pygame window.
+        The function `handle_game_title` sets the game title for a Pygame window.
         
-        :param arg: The `arg` parameter in the `handle_game_title` function is a string representing the
-        title of a game. The function is responsible for processing and setting the game title to the
-        provided argument. The function first removes any leading or trailing whitespaces from the
-        argument. Then, it checks if the argument
-        :param engine: The `handle_game_title` function takes three parameters: `self`, `arg`, and
-        `engine`. In this function, the `arg` parameter is a string representing the title of a game.
-        The function first removes any leading or trailing whitespace from the `arg` string using the
-        `strip()`
-        """
-        arg = arg.strip()
-        if arg.startswith("(") and arg.endswith(")"):
-            arg = arg[1:-1].strip()
-        arg = arg.strip('"').strip("'")
-
-        pygame.display.set_caption(arg)
+        :param args: A tuple with the title of the game, already stripped of parentheses and quotes.
+        :param engine: The game engine instance.
+        """
+        title, = args
+
+        pygame.display.set_caption(title)
     
-    def handle_game_window_icon(self, arg, engine):
+    def handle_game_window_icon(self, args, engine):
         """
         This function handles loading and setting the window icon for a game using Pygame in Python.
         
-        :param arg: The `arg` parameter in the `handle_game_window_icon` function seems to represent the
-        name of the icon file without the file extension. The function then attempts to load an image
-        file with the given name from the "ui/icon" directory with a ".jpg" extension and set it as the
-        icon
-        :param engine: The `engine` parameter in the `handle_game_window_icon` function seems to be an
-        instance of some class that has a property or method called `game_path`. This property or method
-        is used to construct the path to the game resources
-        """
-        arg = arg.strip()
-        if arg.startswith("(") and arg.endswith(")"):
-            arg = arg[1:-1].strip()
-        arg = arg.strip('"').strip("'")
-
-        if not arg:
-            arg = "window_icon"
-    
-        load_image = ScriptLexer(engine.game_path, engine).load_image
+        :param args: A tuple with the name of the icon file without the file extension. The function
+        then attempts to load an image file with the given name from the "ui/icon" directory with a
+        ".jpg" extension and set it as the icon
+        :param engine: The game engine instance, used to access the game resources
+        """
+        name, = args
 
-        relative_path = os.path.join("ui","icon", arg + ".jpg")
+        relative_path = os.path.join("ui","icon", name + ".jpg")
 
         try:
-            icon = load_image(relative_path)
+            icon = engine.images.load(relative_path)
             pygame.display.set_icon(icon)
  
         except Exception as e:
             raise Exception(f"[Icon] Error loading the window icon: {e}")
         
 
-    def handle_display(self, arg, engine):
+    def handle_display(self, args, engine):
         """
         Configures the window size and updates the configuration of the interface elements.
         The syntax is expected:
@@ -619,20 +566,8 @@ class EventManager:
         where the numbers indicate the desired width and height, but are limited to the maximum of the monitor.
       
         """
-        arg = arg.strip()
-        if arg.startswith("(") and arg.endswith(")"):
-            arg = arg[1:-1].strip()
-        parts = arg.split(",")
-        if len(parts) != 2:
-            raise Exception("[Display] Invalid format. Expected: @Display(width,height)")
-        try:
-            width = int(parts[0].strip())
-            height = int(parts[1].strip())
-        except ValueError:
-            raise Exception("[Display] The dimensions must be whole numbers.")
+        width, height = args
 
-    
- 
         engine.config["screen_width"] = width
         engine.config["screen_height"] = height
         
@@ -666,43 +601,36 @@ class EventManager:
         }
 
         engine.renderer.update_set_mode((width, height))
+        engine.images.invalidate_scaled()
         
         engine.Log(f"[Display] Window set to {width}x{height}.")
 
-    def handle_choice_menu(self, arg, engine):
+    def handle_choice_menu(self, args, engine):
         """
         Initiates a choicemenu block where subsequent @option commands define menu options.
         
-        :param arg: Unused argument.
+        :param args: Unused argument.
         :param engine: The game engine instance.
         """
         engine.current_choice_buttons = []
         engine.Log("[choice] Menu block started.")
     
-    def handle_option_button(self, arg, engine):
+    def handle_option_button(self, args, engine):
         """
-        Parses a button command to extract a label and an event action, then adds them to the current menu.
-        Expected syntax: @button "Label" event <command>
+        Adds a label and its tokenized event action to the current menu.
+        Expected syntax: @option "Label" event Set(var, value)
         
-        :param arg: The argument string containing the label and the event command.
+        :param args: The label and the tokenized event command.
         :param engine: The game engine instance.
         """
-        pattern = r'^"([^"]+)"\s+event\s+(.+)$'
-        arg = arg.strip()
-        match = re.match(pattern, arg)
-        if not match:
-            raise Exception('[choice-button] Invalid format. Expected: @option "Label" event Set(var, test).')
-        raw_label = match.group(1)
-        action = match.group(2).strip()
+        raw_label, action = args
         if not hasattr(engine, "current_choice_buttons"):
             engine.current_choice_buttons = []
-        if not action.startswith("Set"):
-            raise Exception('[choice-button] Invalid event. Expected: @option "Label" event Set(var, test).')
         
         engine.current_choice_buttons.append({"raw_label": raw_label, "event": action})
         engine.Log(f"[choice-button] Button added: '{raw_label}' -> '{action}'.")
     
-    def handle_end_choice(self, arg, engine):
+    def handle_end_choice(self, args, engine):
         """
         """
         clock = engine.clock
@@ -730,22 +658,11 @@ class EventManager:
             text_rect.center = btn_rect.center
             buttons.append({"rect": btn_rect, "event": btn["event"], "text": text_surface, "text_rect": text_rect})
         selected_action = None
-        running_menu = True
-        while running_menu and engine.running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    engine.running = False
-                    running_menu = False
-                elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                    mouse_x, mouse_y = event.pos
-                    if panel_rect.collidepoint(mouse_x, mouse_y):
-                        local_x = mouse_x - panel_x
-                        local_y = mouse_y - panel_y
-                        for btn in buttons:
-                            if btn["rect"].collidepoint(local_x, local_y):
-                                selected_action = btn["event"]
-                                running_menu = False
-                                break
+        while selected_action is None and engine.running:
+            engine.profiler.frame()
+            index = engine.input.poll_choice(engine, panel_rect, buttons)
+            if index is not None:
+                selected_action = buttons[index]["event"]
             panel_surface = pygame.Surface((panel_width, panel_height), pygame.SRCALPHA)
             for btn in buttons:
                 pygame.draw.rect(panel_surface, (100, 100, 100), btn["rect"])
@@ -754,49 +671,42 @@ class EventManager:
             engine.renderer.draw_background()
             engine.renderer.screen.blit(panel_surface, (panel_x, panel_y))
             pygame.display.update()
+            engine.mixer.update()
         if selected_action:
-            if not selected_action.startswith("@"):
-                selected_action = "@" + selected_action
             engine.Log(f"[menu] Selected action: {selected_action}")
             self.handle(selected_action, engine)
 
-    def handle_menu(self, arg, engine):
+    def handle_menu(self, args, engine):
         """
         Initiates a menu block where subsequent @button commands define menu options.
         
-        :param arg: Unused argument.
+        :param args: Unused argument.
         :param engine: The game engine instance.
         """
         engine.current_menu_buttons = []
         engine.Log("[menu] Menu block started.")
 
-    def handle_button(self, arg, engine):
+    def handle_button(self, args, engine):
         """
-        Parses a button command to extract a label and an event action, then adds them to the current menu.
+        Adds a label and its tokenized event action to the current menu.
         Expected syntax: @button "Label" event <command>
         
-        :param arg: The argument string containing the label and the event command.
+        :param args: The label and the tokenized event command.
         :param engine: The game engine instance.
         """
-        pattern = r'^"([^"]+)"\s+event\s+(.+)$'
-        arg = arg.strip()
-        match = re.match(pattern, arg)
-        if not match:
-            raise Exception('[button] Invalid format. Expected: @button "Label" event <command>.')
-        raw_label = match.group(1)
-        action = match.group(2).strip()
+        raw_label, action = args
         if not hasattr(engine, "current_menu_buttons"):
             engine.current_menu_buttons = []
         
         engine.current_menu_buttons.append({"raw_label": raw_label, "event": action})
         engine.Log(f"[button] Button added: '{raw_label}' -> '{action}'.")
         
-    def handle_endmenu(self, arg, engine):
+    def handle_endmenu(self, args, engine):
         """
         Handles the display and interaction with a menu interface. It renders a centered panel with buttons,
         waits for user selection, and then executes the associated event command.
         
-        :param arg: Unused argument.
+        :param args: Unused argument.
         :param engine: The game engine instance.
         """
         clock = engine.clock
@@ -824,22 +734,11 @@ class EventManager:
             text_rect.center = btn_rect.center
             buttons.append({"rect": btn_rect, "event": btn["event"], "text": text_surface, "text_rect": text_rect})
         selected_action = None
-        running_menu = True
-        while running_menu and engine.running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    engine.running = False
-                    running_menu = False
-                elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                    mouse_x, mouse_y = event.pos
-                    if panel_rect.collidepoint(mouse_x, mouse_y):
-                        local_x = mouse_x - panel_x
-                        local_y = mouse_y - panel_y
-                        for btn in buttons:
-                            if btn["rect"].collidepoint(local_x, local_y):
-                                selected_action = btn["event"]
-                                running_menu = False
-                                break
+        while selected_action is None and engine.running:
+            engine.profiler.frame()
+            index = engine.input.poll_choice(engine, panel_rect, buttons)
+            if index is not None:
+                selected_action = buttons[index]["event"]
             panel_surface = pygame.Surface((panel_width, panel_height), pygame.SRCALPHA)
             #panel_surface.fill(panel_bg_color)
             #pygame.draw.rect(panel_surface, border_color, panel_surface.get_rect(), 2)
@@ -850,29 +749,21 @@ class EventManager:
             engine.renderer.draw_background()
             engine.renderer.screen.blit(panel_surface, (panel_x, panel_y))
             pygame.display.update()
-            clock.tick(30)
+            engine.mixer.update()
+            clock.tick(30 if engine.frame_pacing else 0)
         if selected_action:
-            if not selected_action.startswith("@"):
-                selected_action = "@" + selected_action
             engine.Log(f"[menu] Selected action: {selected_action}")
             self.handle(selected_action, engine)
 
-    def handle_Set_event(self, arg, engine):
+    def handle_Set_event(self, args, engine):
         """
         Updates the value of a defined variable using the syntax: Set(variable, value)
         For example, @button "Exit" event Set(chek, true).
         
-        :param arg: The argument string containing the variable name and new value.
+        :param args: The variable name and the new value.
         :param engine: The game engine instance.
         """
-        arg = arg.strip()
-        if arg.startswith("(") and arg.endswith(")"):
-            arg = arg[1:-1].strip()
-        parts = arg.split(",")
-        if len(parts) != 2:
-            raise Exception("[Set] Invalid format. Expected: Set(variable, value)")
-        var_name = parts[0].strip()
-        new_value = parts[1].strip().strip('"')
+        var_name, new_value = args
         if var_name in engine.characters:
             raise Exception(f"[Set] The variable '{var_name}' cannot be modified as it is an already defined character!")
         if var_name in engine.scenes:
@@ -885,12 +776,12 @@ class EventManager:
     
     # TODO: IMPLEMENT SAVE AND LOAD
 
-    def handle_save(self, arg, engine):
+    def handle_save(self, args, engine):
         """
         Saves the game state to a file. The saved state includes variables, characters, scenes, the current 
         lexer position, the original commands of the script, and any checkpoints.
         
-        :param arg: Optional argument (not used in this implementation).
+        :param args: Optional argument (not used in this implementation).
         :param engine: The game engine instance containing state information.
         """
         state = {
@@ -909,12 +800,12 @@ class EventManager:
         except Exception as e:
             raise Exception(f"[save] Error saving game: {e}")
     
-    def handle_load_save(self, arg, engine):
+    def handle_load_save(self, args, engine):
         """
         Loads the game state from a save file. The state includes variables, characters, scenes, the lexer's
         original commands, current position, and checkpoints.
         
-        :param arg: Optional argument (not used in this implementation).
+        :param args: Optional argument (not used in this implementation).
         :param engine: The game engine instance to which the state will be applied.
         """
         save_file = os.path.join(engine.game_path, "data.save")
@@ -926,33 +817,33 @@ class EventManager:
             engine.scenes = state.get("scenes", {})
             if "original_commands" in state and "lexer_current" in state:
                 engine.lexer.original_commands = state["original_commands"]
-                engine.lexer.commands = state["original_commands"][state["lexer_current"]:]
-                engine.lexer.current = 0
+                engine.lexer.commands = state["original_commands"]
+                engine.lexer.current = state["lexer_current"]
             engine.checkpoints = state.get("checkpoints", {})
             engine.Log(f"[load] Game loaded from '{save_file}'.")
         except Exception as e:
             raise Exception(f"[load] Error loading game: {e}")
     
-    def handle_bgm(self, arg, engine):
+    def handle_bgm(self, args, engine):
         """
         Plays looping background music using a file located at:
         data/audio/bgm/<filename>.mp3.
         """
-        filename = arg.strip()
+        filename, = args
         bgm = Audio(filename, "bgm", engine)
 
         bgm.play(loop=-1)
 
         engine.Log(f"[bgm] Playing background music '{filename}'.")
 
-    def handle_sfx(self, arg, engine):
+    def handle_sfx(self, args, engine):
         """
         Plays a sound effect using a file located at:
         data/audio/sfx/<filename>.mp3.
         """
-        filename = arg.strip()
+        filename, = args
         
         sfx = Audio(filename, "sfx", engine)
 
-        sfx.play(loop=-1)
+        sfx.play(fade_ms=0)
         engine.Log(f"[sfx] Playing sound effect '{filename}'.")
\ No newline at end of file
@@ -0,0 +1,365 @@
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from vne.core import VNEngine
+from vne.events import EventManager
+from vne.lexer import ScriptLexer
+from vne import compiler
+
+
+class ChoicePoint(BaseException):
+    """
+    Raised when the script reaches a menu, carrying a snapshot of the state. It derives
+    from BaseException so the handlers that wrap errors (eg. @Load) let it through.
+    """
+    def __init__(self, state):
+        super().__init__()
+        self.state = state
+
+
+class ExplorerInput:
+    """
+    Input source of the explorer: dialogues advance immediately, and menus stop the
+    execution with a snapshot of the state, so each option can be explored from it.
+    """
+    def poll_advance(self, engine):
+        return True
+
+    def poll_choice(self, engine, panel_rect, buttons):
+        lexer = engine.lexer
+        if lexer.current and lexer.commands[lexer.current - 1][0] == "end_choice":
+            entries = engine.current_choice_buttons
+        else:
+            entries = engine.current_menu_buttons
+        raise ChoicePoint({
+            "script": lexer.name,
+            "index": lexer.current,
+            # Scripts that @Load-ed this one, resumed once it ends.
+            "outer": [(outer.name, outer.current) for outer in engine.lexer_stack],
+            "vars": dict(engine.vars),
+            "characters": dict(engine.characters),
+            "scenes": dict(engine.scenes),
+            "checkpoints": dict(engine.checkpoints),
+            "system_files": list(engine.event_manager.system_files),
+            "options": [(entry["raw_label"], entry["event"]) for entry in entries]
+        })
+
+
+class ExplorerEventManager(EventManager):
+    """
+    Runs the regular handlers, recording every executed command. Sound is only checked
+    to exist and splash screens don't wait.
+    """
+    def __init__(self):
+        super().__init__()
+        self.visited = set()
+        self.commands = 0
+        self.checked_files = set()
+
+    def handle(self, command, engine=None):
+        lexer = engine.lexer
+        self.visited.add((lexer.name, lexer.current - 1))
+        self.commands += 1
+        super().handle(command, engine)
+
+    def check_file(self, relative_path, engine):
+        if relative_path not in self.checked_files:
+            engine.resource_manager.get_bytes(relative_path)
+            self.checked_files.add(relative_path)
+
+    def handle_bgm(self, args, engine):
+        filename, = args
+        self.check_file(os.path.join("audio", "bgm", filename + ".mp3"), engine)
+
+    def handle_sfx(self, args, engine):
+        filename, = args
+        self.check_file(os.path.join("audio", "sfx", filename + ".mp3"), engine)
+
+    def handle_splash_screen(self, args, engine):
+        name, = args
+        engine.images.load(os.path.join("ui", name + ".jpg"))
+
+
+class ExplorerEngine(VNEngine):
+    """
+    A headless engine that executes scripts without drawing or waiting for the player.
+    """
+    def __init__(self, game_path):
+        super().__init__(game_path, headless=True, input=ExplorerInput(), config={
+            "log_file": os.devnull,
+            "log_level": "error"
+        })
+        self.event_manager = ExplorerEventManager()
+        self.renderer.initialize()
+        self.initial_script = self.lexer.name
+        self.initial_system_files = list(self.event_manager.system_files)
+
+    def wait_for_keypress(self):
+        pass
+
+    def restore(self, state):
+        """
+        Puts the engine in the state of a snapshot taken at a menu.
+        """
+        self.running = True
+        self.vars = dict(state["vars"])
+        self.characters = dict(state["characters"])
+        self.scenes = dict(state["scenes"])
+        self.checkpoints = dict(state["checkpoints"])
+        self.event_manager.system_files = list(state["system_files"])
+        self.sprites = {}
+        self.current_bg = None
+        self.lexer = self.lexer_at(state["script"], state["index"])
+        self.lexer_stack = [self.lexer_at(name, index) for name, index in state["outer"]]
+
+    def lexer_at(self, name, index):
+        lexer = ScriptLexer(self.game_path, self, self.event_manager.load_script(name, self))
+        lexer.seek(index)
+        return lexer
+
+    def run_command(self, command):
+        """
+        Handles a command like the frame loop does. A command that switches scenes leaves
+        the @Load-ed scripts, so the scripts waiting for them are dropped.
+        """
+        lexer = self.lexer
+        self.event_manager.handle(command, self)
+        if self.lexer is not lexer:
+            self.lexer_stack = []
+
+    def explore(self, state, option, max_commands):
+        """
+        Runs one option of the menu of `state` (or the game from the start when `state`
+        is None) until the next menu, the end of the game or an error.
+
+        :return: A dict with the next menu state, or the ending, plus the executed commands.
+        """
+        manager = self.event_manager
+        manager.visited = set()
+        manager.commands = 0
+        outcome = {"state": None, "ending": None, "error": None, "location": None}
+        try:
+            if state is None:
+                self.restore({"script": self.initial_script, "index": 0, "outer": [], "vars": {"continue": "false"},
+                              "characters": {}, "scenes": {}, "checkpoints": {},
+                              "system_files": self.initial_system_files})
+            else:
+                self.restore(state)
+                self.run_command(state["options"][option][1])
+            while self.running:
+                if manager.commands > max_commands:
+                    raise Exception(f"[explorer] More than {max_commands} commands without reaching a menu, "
+                                    "the script may be in an infinite loop.")
+                command = self.lexer.get_next_command()
+                if command is None:
+                    if self.lexer_stack:
+                        # The @Load-ed script finished, its caller goes on after the @Load.
+                        self.lexer = self.lexer_stack.pop()
+                        continue
+                    outcome["ending"] = f"end of {self.lexer.name}"
+                    break
+                self.run_command(command)
+            else:
+                outcome["ending"] = "exit"
+        except ChoicePoint as choice:
+            outcome["state"] = choice.state
+        except Exception as e:
+            outcome["error"] = str(e)
+            outcome["location"] = (self.lexer.name, self.lexer.current - 1)
+        outcome["visited"] = manager.visited
+        outcome["commands"] = manager.commands
+        return outcome
+
+
+worker_engine = None
+
+
+def init_worker(game_path):
+    global worker_engine
+    worker_engine = ExplorerEngine(game_path)
+
+
+def explore_task(state, option, max_commands):
+    return worker_engine.explore(state, option, max_commands)
+
+
+def state_key(state):
+    return (state["script"], state["index"], tuple(map(tuple, state["outer"])),
+            tuple(sorted(state["vars"].items())),
+            tuple(sorted(state["characters"].items())),
+            tuple(sorted(state["checkpoints"].items())))
+
+
+def source_name(script_name):
+    name = script_name.replace("\\", "/")
+    return name[:-1] if name.endswith(".kagc") else name
+
+
+class StoryExplorer:
+    """
+    Explores every path of a game: the script runs without rendering, and at each menu
+    the state is saved and every option is run from it. Menus reached again with the
+    same state (same position, variables, characters and checkpoints) aren't explored twice.
+    Options are run in parallel by worker processes.
+
+    :param game_path: The game folder, with compiled scripts.
+    :param workers: Number of worker processes, 0 runs everything in this process.
+    :param max_states: Maximum number of distinct menu states explored.
+    :param max_commands: Commands an option can run before it's reported as an infinite loop.
+    """
+    def __init__(self, game_path, workers=None, max_states=100000, max_commands=1000000):
+        self.game_path = game_path
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_states = max_states
+        self.max_commands = max_commands
+        self.seen = set()
+        self.visited = {}
+        self.errors = {}
+        self.endings = {}
+        self.paths = 0
+        self.commands = 0
+        self.elapsed = 0.0
+        self.truncated = False
+
+    def run(self):
+        start = time.perf_counter()
+        if self.workers:
+            with ProcessPoolExecutor(self.workers, initializer=init_worker, initargs=(self.game_path,)) as pool:
+                self.explore(lambda *task: pool.submit(explore_task, *task))
+        else:
+            engine = ExplorerEngine(self.game_path)
+            self.explore(lambda *task: finished_future(engine.explore(*task)))
+        self.elapsed = time.perf_counter() - start
+        return self
+
+    def explore(self, submit):
+        pending = {submit(None, None, self.max_commands): ()}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                for task in self.collect(future.result(), path):
+                    pending[submit(*task[:2], self.max_commands)] = task[2]
+
+    def collect(self, outcome, path):
+        """
+        Merges the outcome of one task and returns the tasks for the options of the menu it reached.
+        """
+        self.paths += 1
+        self.commands += outcome["commands"]
+        for script, index in outcome["visited"]:
+            self.visited.setdefault(source_name(script), set()).add(index)
+        if outcome["error"]:
+            script, index = outcome["location"]
+            self.errors.setdefault((outcome["error"], source_name(script), index), path)
+            return []
+        if outcome["ending"]:
+            self.endings[outcome["ending"]] = self.endings.get(outcome["ending"], 0) + 1
+            return []
+        state = outcome["state"]
+        key = state_key(state)
+        if key in self.seen:
+            return []
+        if len(self.seen) >= self.max_states:
+            self.truncated = True
+            return []
+        self.seen.add(key)
+        return [(state, option, path + (label,)) for option, (label, _) in enumerate(state["options"])]
+
+    def sources(self):
+        """
+        Compiles the .kag sources of the game, keyed by their path relative to the data folder.
+        """
+        data = os.path.join(self.game_path, "data")
+        scripts = {}
+        for root, dirs, files in os.walk(data):
+            for file in files:
+                if file.endswith(".kag"):
+                    path = os.path.join(root, file)
+                    name = os.path.relpath(path, data).replace("\\", "/")
+                    with open(path, "r", encoding="utf-8") as f:
+                        try:
+                            scripts[name] = compiler.compile_script(f.read(), name)
+                        except Exception:
+                            continue
+        return scripts
+
+    def line_of(self, scripts, name, index):
+        script = scripts.get(name)
+        if script is not None and 0 <= index < len(script.lines):
+            return script.lines[index]
+        return None
+
+    def report(self):
+        """
+        Returns the results as a dict: reachable and unreachable scenes, unreachable lines
+        per script, errors with the options that lead to them, and throughput.
+        """
+        scripts = self.sources()
+        scenes = sorted(name for name in scripts if name.startswith("scenes/"))
+        unreachable_lines = {}
+        for name, script in sorted(scripts.items()):
+            visited = self.visited.get(name, set())
+            lines = [line for index, line in enumerate(script.lines) if index not in visited]
+            if lines:
+                unreachable_lines[name] = lines
+        return {
+            "paths": self.paths,
+            "menu_states": len(self.seen),
+            "truncated": self.truncated,
+            "commands": self.commands,
+            "seconds": self.elapsed,
+            "commands_per_second": self.commands / self.elapsed if self.elapsed else 0.0,
+            "workers": self.workers,
+            "reachable_scenes": [name for name in scenes if name in self.visited],
+            "unreachable_scenes": [name for name in scenes if name not in self.visited],
+            "unreachable_lines": unreachable_lines,
+            "endings": self.endings,
+            "errors": [
+                {"message": message, "script": name, "line": self.line_of(scripts, name, index), "path": list(path)}
+                for (message, name, index), path in self.errors.items()
+            ]
+        }
+
+
+def finished_future(value):
+    """
+    Returns a future that already holds `value`, used to explore without worker processes.
+    """
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def format_lines(lines):
+    """
+    Formats line numbers as ranges, eg. [1, 2, 3, 7] -> "1-3, 7".
+    """
+    ranges = []
+    for line in lines:
+        if ranges and line == ranges[-1][1] + 1:
+            ranges[-1][1] = line
+        else:
+            ranges.append([line, line])
+    return ", ".join(str(first) if first == last else f"{first}-{last}" for first, last in ranges)
+
+
+def format_report(report):
+    out = [
+        f"Explored {report['paths']} paths ({report['menu_states']} distinct menu states) in {report['seconds']:.2f}s "
+        f"with {report['workers']} workers: {report['commands']} commands, {report['commands_per_second']:.0f} commands/s"
+    ]
+    if report["truncated"]:
+        out.append("The exploration stopped at the maximum number of menu states.")
+    out.append(f"Reachable scenes ({len(report['reachable_scenes'])}): {', '.join(report['reachable_scenes'])}")
+    out.append(f"Unreachable scenes ({len(report['unreachable_scenes'])}): {', '.join(report['unreachable_scenes'])}")
+    out.append("Unreachable lines:")
+    for name, lines in report["unreachable_lines"].items():
+        out.append(f"  {name}: {format_lines(lines)}")
+    out.append(f"Endings: {', '.join(f'{ending} ({count})' for ending, count in report['endings'].items())}")
+    out.append(f"Errors ({len(report['errors'])}):")
+    for error in report["errors"]:
+        out.append(f"  {error['script']}:{error['line']}: {error['message']}")
+        out.append(f"    path: {' > '.join(error['path']) or '(start)'}")
+    return "\n".join(out)
@@ -0,0 +1,66 @@
+import io
+import pygame
+from vne.cache import LRUCache
+
+
+def surface_size(surface):
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
+class ImageLoader:
+    """
+    Loads images through the resource manager and keeps the converted Surfaces in a
+    memory-budgeted LRU cache. Backgrounds scaled to the screen size are cached as well,
+    and dropped when the window size changes.
+    """
+    def __init__(self, engine):
+        self.engine = engine
+        self.cache = LRUCache(
+            "images",
+            engine.config.get("image_cache_size", 256),
+            engine.config.get("image_cache_mb", 256) * 2**20,
+            surface_size
+        )
+
+    def load(self, relative_path):
+        """
+        Returns the image at `relative_path` converted for fast blitting, decoding it only
+        the first time.
+
+        :param relative_path: Path of the image relative to the game's data directory.
+        :return: The converted Surface. It is shared, callers must not draw on it.
+        """
+        image = self.cache.get((relative_path, None))
+        if image is None:
+            image = self.engine.assets.fetch(("image", relative_path), lambda: self.decode(relative_path))
+            self.cache.put((relative_path, None), image)
+        return image
+
+    def load_scaled(self, relative_path, size):
+        """
+        Returns the image at `relative_path` scaled to `size`, eg. a background scaled to the screen.
+        """
+        size = tuple(size)
+        image = self.cache.get((relative_path, size))
+        if image is None:
+            image = pygame.transform.scale(self.load(relative_path), size)
+            self.cache.put((relative_path, size), image)
+        return image
+
+    def decode(self, relative_path):
+        # Also called from the asset prefetcher threads.
+        try:
+            image_bytes = self.engine.resource_manager.get_bytes(relative_path)
+            with self.engine.profiler.span("image_decode", relative_path):
+                return pygame.image.load(io.BytesIO(image_bytes), relative_path).convert_alpha()
+        except Exception as e:
+            raise Exception(f"Error loading image at '{relative_path}': {e}")
+
+    def invalidate_scaled(self):
+        """
+        Drops the scaled images, called when the window size changes.
+        """
+        self.cache.discard_if(lambda key: key[1] is not None)
+
+    def stats(self):
+        return self.cache.stats()
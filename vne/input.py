@@ -0,0 +1,95 @@
+import pygame
+
+
+class PygameInput:
+    """
+    Reads the player input from the pygame event queue: a left click advances the
+    dialogue or picks the menu option under the mouse, closing the window stops the game.
+    """
+    def poll_advance(self, engine):
+        """
+        Processes the pending events while a dialogue is shown.
+
+        :return: True if the player asked for the next dialogue.
+        """
+        advanced = False
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                engine.running = False
+                return False
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                advanced = True
+        return advanced
+
+    def poll_skip(self, engine):
+        """
+        Processes the pending events while a splash screen is shown.
+
+        :return: True if the player pressed a key or clicked to skip it.
+        """
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                engine.running = False
+                return False
+            if event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+                return True
+        return False
+
+    def poll_choice(self, engine, panel_rect, buttons):
+        """
+        Processes the pending events while a menu is shown.
+
+        :param panel_rect: Position of the menu panel on the screen.
+        :param buttons: The menu buttons, their "rect" is relative to the panel.
+        :return: The index of the selected button, or None.
+        """
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                engine.running = False
+                return None
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                mouse_x, mouse_y = event.pos
+                if panel_rect.collidepoint(mouse_x, mouse_y):
+                    local_x = mouse_x - panel_rect.x
+                    local_y = mouse_y - panel_rect.y
+                    for index, btn in enumerate(buttons):
+                        if btn["rect"].collidepoint(local_x, local_y):
+                            return index
+        return None
+
+
+class ScriptedInput:
+    """
+    Plays the game without a player: dialogues advance on their own, splash screens are
+    skipped and menus pick the options listed in `choices`, in order. Used by the headless mode.
+
+    :param choices: Index of the option picked in each menu, in order.
+    :param default_choice: Option picked once `choices` runs out.
+    :param advance_after: Number of frames each dialogue stays on screen.
+    """
+    def __init__(self, choices=(), default_choice=0, advance_after=1):
+        self.choices = list(choices)
+        self.default_choice = default_choice
+        self.advance_after = max(1, advance_after)
+        self.frames = 0
+        self.history = []
+
+    def poll_advance(self, engine):
+        pygame.event.pump()
+        self.frames += 1
+        if self.frames >= self.advance_after:
+            self.frames = 0
+            return True
+        return False
+
+    def poll_skip(self, engine):
+        pygame.event.pump()
+        return True
+
+    def poll_choice(self, engine, panel_rect, buttons):
+        pygame.event.pump()
+        index = self.choices.pop(0) if self.choices else self.default_choice
+        if not 0 <= index < len(buttons):
+            raise Exception(f"[input] Option {index} doesn't exist, the menu has {len(buttons)} options.")
+        self.history.append(index)
+        return index
@@ -1,18 +1,22 @@
-import io
-import os
 import pygame
 from vne.aes import AES
 from vne.config import key
+from vne import compiler
 
 class ScriptLexer:
  
-    def __init__(self, game_path, engine):
+    def __init__(self, game_path, engine, script=None):
         self.game_path = game_path
         self.engine = engine
         self.commands = []
         self.original_commands = []
+        self.labels = {}
+        self.name = ""
         self.current = 0
-        self.load_scripts()
+        if script is None:
+            self.load_scripts()
+        else:
+            self.load_script(script)
     
     def load_scripts(self):
         """
@@ -23,34 +27,52 @@ class ScriptLexer:
         try:
             compiled_path = base_name + ".kagc"
             file_bytes = self.engine.resource_manager.get_bytes(compiled_path)
-            plain_bytes = AES(file_bytes, key).decrypt().decode("utf-8", errors="replace")
-            content = plain_bytes
-            self.commands = self.parse_script(content)
-            self.original_commands = list(self.commands)
+            self.load_script(self.load_compiled(file_bytes, compiled_path))
         except Exception as e:
             self.commands = []
             self.original_commands = []
             raise Exception(f"[Lexer] Compiled version of 'startup' not found: {e}")
+
+    def load_compiled(self, file_bytes, name=""):
+        """
+        Decrypts the content of a .kagc file and loads its pre-tokenized command stream.
+
+        :param file_bytes: The encrypted content of the file.
+        :param name: The path of the file, used in error messages.
+        :return: The compiled `Script`.
+        """
+        with self.engine.profiler.span("aes_decrypt", name):
+            data = AES(file_bytes, key).decrypt()
+        return compiler.loads(data, name)
+
+    def load_script(self, script):
+        """
+        Replaces the commands of the lexer with the ones of a compiled script and
+        rewinds it to the first command.
+        """
+        self.commands = script.commands
+        self.original_commands = script.commands
+        self.labels = script.labels
+        self.name = script.name
+        self.current = 0
+
+    def seek(self, index):
+        """
+        Moves the lexer so the next command returned is the one at `index`.
+        """
+        if not 0 <= index <= len(self.commands):
+            raise Exception(f"[Lexer] Command index {index} is out of range.")
+        self.current = index
             
     def parse_script(self, content):
         """
-        The function `parse_script` takes in a string of content, splits it into lines, removes leading
-        and trailing whitespace, filters out empty lines and lines starting with `#`, and returns a list
-        of commands.
+        The function `parse_script` compiles a string of KAG source into a list of
+        ``(opcode, args)`` commands, skipping empty lines and lines starting with `#`.
         
-        :param content: The `parse_script` method takes a string `content` as input and splits it into
-        lines. It then iterates over each line, strips any leading or trailing whitespace, and checks if
-        the line is not empty and does not start with a `#` (comment). If these conditions are met
-        :return: The `parse_script` method returns a list of commands extracted from the input `content`
-        after removing empty lines and lines starting with `#`.
+        :param content: The source code of the script.
+        :return: The list of tokenized commands.
         """
-        lines = content.splitlines()
-        commands = []
-        for line in lines:
-            stripped_line = line.strip()
-            if stripped_line and not stripped_line.startswith("#"):
-                commands.append(stripped_line)
-        return commands
+        return compiler.compile_script(content).commands
 
     def get_next_command(self):
         """
@@ -61,38 +83,11 @@ class ScriptLexer:
         if self.current < len(self.commands):
             cmd = self.commands[self.current]
             self.current += 1
-            self.engine.Log(f"[get-next-command] {cmd}")
+            if self.engine.logger.tracing:
+                self.engine.logger.trace(f"[get-next-command] {cmd}")
             return cmd
         return None
     
-    def load_image(self, relative_path):
-        """
-        The function `load_image` loads an image from a relative path using Pygame, handling exceptions
-        and ensuring full opacity.
-        
-        :param relative_path: The `load_image` method you provided seems to be a part of a class that
-        loads images for a game engine. The `relative_path` parameter is used to specify the path to the
-        image file relative to the game's data directory
-        :return: The `load_image` method returns the loaded image after processing it with full opacity.
-        """
-        try:
-            image_bytes = self.engine.resource_manager.get_bytes(relative_path)
-            image_stream = io.BytesIO(image_bytes)
-            image = pygame.image.load(image_stream).convert_alpha()
- 
-            return image
-        except Exception as e:
-            full_path = os.path.join(self.engine.game_path, "data", relative_path)
-            if os.path.exists(full_path):
-                try:
-                    image = pygame.image.load(full_path).convert_alpha()
- 
-                    return image
-                except Exception as e2:
-                    raise Exception(f"Error loading image from '{full_path}': {e2}")
-            else:
-                raise Exception(f"Error loading image at '{relative_path}': {e}")
-    
     def force_full_opacity(self, surface):
         """
         This Python function converts a surface to use alpha transparency and sets all alpha values to
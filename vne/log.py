@@ -0,0 +1,124 @@
+import atexit
+import os
+import threading
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVELS = {
+    "debug": DEBUG,
+    "info": INFO,
+    "warning": WARNING,
+    "error": ERROR
+}
+
+
+class Logger:
+    """
+    Buffers log messages in memory and writes them to the log file from a background
+    thread, so logging doesn't cost a file open/write/close on the main thread.
+
+    Errors are written immediately, and the buffer is always flushed when the logger is
+    closed (at exit or when the game finishes). The file is rotated once it grows past
+    `max_bytes`, keeping `backups` old files (log.1.txt, log.2.txt...).
+
+    :param path: Path of the log file.
+    :param level: Messages below this level are dropped.
+    :param tracing: Enables the per-command trace messages. Off in production builds.
+    :param flush_interval: Seconds between background flushes.
+    :param max_bytes: Size of the log file that triggers a rotation, 0 disables rotation.
+    :param backups: Number of rotated files that are kept.
+    """
+    def __init__(self, path, level=INFO, tracing=False, flush_interval=0.5, max_bytes=2**20, backups=2):
+        self.path = path
+        self.level = level
+        self.tracing = tracing
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.io_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.file = None
+        self.closed = False
+        self.thread = threading.Thread(target=self.worker, name="vne-log", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def begin(self, header):
+        """
+        Starts a new log file with `header`, discarding the contents of the previous session.
+        """
+        with self.io_lock:
+            self.close_file()
+            with open(self.path, "w") as f:
+                f.write(header)
+
+    def log(self, message, level=INFO):
+        if level < self.level:
+            return
+        with self.lock:
+            self.buffer.append(message)
+        if level >= ERROR or self.closed:
+            self.flush()
+
+    def trace(self, message):
+        """
+        Logs a per-command trace message, regardless of the level. Callers should check
+        `tracing` before building the message, so disabled tracing costs nothing.
+        """
+        if self.tracing:
+            with self.lock:
+                self.buffer.append(message)
+
+    def flush(self):
+        with self.lock:
+            if not self.buffer:
+                return
+            lines, self.buffer = self.buffer, []
+        with self.io_lock:
+            try:
+                if self.file is None:
+                    self.file = open(self.path, "a")
+                self.file.write("\n" + "\n".join(lines))
+                self.file.flush()
+                if self.max_bytes and self.file.tell() > self.max_bytes:
+                    self.rotate()
+            except OSError as e:
+                print(f"[log] Error writing '{self.path}': {e}")
+
+    def rotate(self):
+        # Called with io_lock held.
+        self.close_file()
+        root, ext = os.path.splitext(self.path)
+        for index in range(self.backups, 0, -1):
+            source = self.path if index == 1 else f"{root}.{index - 1}{ext}"
+            if os.path.exists(source):
+                os.replace(source, f"{root}.{index}{ext}")
+        if not self.backups:
+            os.remove(self.path)
+
+    def close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def worker(self):
+        while not self.closed:
+            self.wake.wait(self.flush_interval)
+            self.flush()
+
+    def close(self):
+        """
+        Flushes the pending messages and stops the background thread.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.wake.set()
+        self.flush()
+        with self.io_lock:
+            self.close_file()
@@ -0,0 +1,132 @@
+import pygame
+
+
+class Fade:
+    """
+    A volume ramp ticked by the frame loop.
+
+    :param apply: Function that sets the volume, eg. `pygame.mixer.music.set_volume`.
+    :param begin: Volume at the start of the fade.
+    :param end: Volume at the end of the fade.
+    :param duration_ms: Length of the fade.
+    :param done: Optional function called once the fade ends.
+    :param kind: Tag used to cancel the fades of one target.
+    """
+    def __init__(self, apply, begin, end, duration_ms, done=None, kind=None):
+        self.apply = apply
+        self.begin = begin
+        self.end = end
+        self.duration_ms = max(1, duration_ms)
+        self.done = done
+        self.kind = kind
+        self.start = pygame.time.get_ticks()
+        apply(begin)
+
+    def update(self, now):
+        """
+        Applies the volume for `now` and returns True once the fade is finished.
+        """
+        progress = min(1.0, (now - self.start) / self.duration_ms)
+        self.apply(self.begin + (self.end - self.begin) * progress)
+        return progress >= 1.0
+
+
+class Mixer:
+    """
+    Plays the background music and the sound effects without blocking the frame loop.
+
+    Music changes are scheduled: the current track fades out, then the next one is
+    loaded and fades in. `pygame.mixer.music` plays a single stream, so the two tracks
+    don't overlap. Sound effects play on a pool of `sfx_channels` channels; when every
+    channel is busy, the one playing the oldest effect is taken over.
+
+    Fades are `Fade` tasks advanced by `update`, which the frame loops call every frame.
+    The `bgm_volume` and `sfx_volume` config values are applied to every track and effect.
+    """
+    MUSIC = "music"
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.bgm_volume = engine.config.get("bgm_volume", 0.6)
+        self.sfx_volume = engine.config.get("sfx_volume", 1.0)
+        self.sfx_channels = engine.config.get("sfx_channels", 8)
+        self.fade_out_ms = engine.config.get("bgm_fade_out_ms", 500)
+        self.tasks = []
+        self.channels = None
+        self.started = {}
+        self.music = None
+        self.queued = None
+
+    def pool(self):
+        if self.channels is None:
+            if pygame.mixer.get_num_channels() < self.sfx_channels:
+                pygame.mixer.set_num_channels(self.sfx_channels)
+            self.channels = [pygame.mixer.Channel(index) for index in range(self.sfx_channels)]
+        return self.channels
+
+    def update(self):
+        """
+        Advances the scheduled fades. Called once per frame.
+        """
+        if not self.tasks:
+            return
+        now = pygame.time.get_ticks()
+        for task in list(self.tasks):
+            if task.update(now):
+                self.tasks.remove(task)
+                if task.done:
+                    task.done()
+
+    def cancel(self, kind):
+        self.tasks = [task for task in self.tasks if task.kind != kind]
+
+    def play_music(self, audio, loops=-1, fade_ms=1000):
+        """
+        Switches the background music to the stream of `audio`, fading the current track
+        out first.
+
+        :param audio: The `Audio` with the stream to play.
+        :param loops: Times the track repeats, -1 to loop forever.
+        :param fade_ms: Length of the fade in of the new track.
+        """
+        self.cancel(self.MUSIC)
+        if self.queued is not None and self.queued is not audio:
+            # A track that was waiting for the fade out and is replaced before it started.
+            self.queued.stream.close()
+        self.queued = None
+        if self.music is not None and pygame.mixer.music.get_busy():
+            self.queued = audio
+            self.tasks.append(Fade(pygame.mixer.music.set_volume, pygame.mixer.music.get_volume(), 0.0,
+                                   self.fade_out_ms, lambda: self.start_music(audio, loops, fade_ms), self.MUSIC))
+        else:
+            self.start_music(audio, loops, fade_ms)
+
+    def start_music(self, audio, loops, fade_ms):
+        self.queued = None
+        # The format is detected from the data, a name hint would force the MP3 decoder.
+        pygame.mixer.music.load(audio.stream)
+        pygame.mixer.music.set_volume(0.0 if fade_ms else self.bgm_volume)
+        pygame.mixer.music.play(loops=loops)
+        if fade_ms:
+            self.tasks.append(Fade(pygame.mixer.music.set_volume, 0.0, self.bgm_volume, fade_ms, kind=self.MUSIC))
+        previous = self.music
+        self.music = audio
+        if previous is not None and previous is not audio:
+            previous.stream.close()
+
+    def play_sound(self, sound, loops=0, fade_ms=0):
+        """
+        Plays a sound effect on a free channel of the pool, or on the channel playing the
+        oldest effect if all of them are busy.
+
+        :return: The channel playing the sound.
+        """
+        channels = self.pool()
+        channel = next((channel for channel in channels if not channel.get_busy()), None)
+        if channel is None:
+            channel = min(channels, key=lambda channel: self.started.get(channel, 0))
+            channel.stop()
+        channel.set_volume(self.sfx_volume)
+        channel.play(sound, loops=loops, fade_ms=fade_ms)
+        self.started[channel] = pygame.time.get_ticks()
+        return channel
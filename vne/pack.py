@@ -0,0 +1,236 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes, hmac
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+MAGIC = b"VNEPACK\0"
+# 1: entry nonces are counters, the index uses nonce 0.
+# 2: nonces are derived from the content, the index is preceded by its nonce.
+FORMAT_VERSION = 2
+READ_VERSIONS = (1, 2)
+# magic, version, salt, index offset, index size
+HEADER = struct.Struct("<8sI16sQQ")
+NONCE_SIZE = 12
+
+STORED = "stored"
+ZLIB = "zlib"
+
+# Formats that are already compressed (or encrypted), compressing them again only costs time.
+INCOMPRESSIBLE = (".jpg", ".jpeg", ".png", ".webp", ".mp3", ".ogg", ".opus", ".kagc", ".pkg", ".zip")
+
+
+def is_pack(path):
+    """
+    Returns True if the file at `path` is a pack in this format, False for old ZIP packs.
+    """
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def derive_key(master_key, salt, info=b"vne-pack"):
+    """
+    Derives the key of a pack from the game key. It runs once per pack, not per entry.
+    """
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=salt, info=info).derive(master_key)
+
+
+def deterministic_salt(master_key):
+    """
+    Returns the salt used by reproducible builds: the same for every pack of a game, so
+    the same files always produce the same pack.
+    """
+    return derive_key(master_key, None, b"vne-pack-salt")[:16]
+
+
+def nonce(counter):
+    return counter.to_bytes(NONCE_SIZE, "big")
+
+
+def derive_nonce(nonce_key, label, data):
+    """
+    Derives the nonce of an entry from its content (a synthetic IV): the same entry always
+    gets the same nonce, and two different entries collide with negligible probability,
+    whatever order they were sealed in.
+    """
+    mac = hmac.HMAC(nonce_key, hashes.SHA256())
+    mac.update(label + b"\0" + data)
+    return int.from_bytes(mac.finalize()[:NONCE_SIZE], "big")
+
+
+def seal(pack_key, nonce_key, name, stored):
+    """
+    Encrypts the stored bytes of the entry `name`.
+
+    :return: The sealed bytes and the nonce, as an integer.
+    """
+    label = name.encode("utf-8")
+    entry_nonce = derive_nonce(nonce_key, label, stored)
+    return AESGCM(pack_key).encrypt(nonce(entry_nonce), stored, label), entry_nonce
+
+
+def seal_file(pack_key, nonce_key, name, path):
+    """
+    Reads, compresses and seals one file. It only depends on its arguments, so the files
+    of a pack can be prepared in worker processes.
+
+    :return: The arguments of `PackWriter.add_sealed`.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    compression, stored = choose_compression(name, data)
+    sealed, entry_nonce = seal(pack_key, nonce_key, name, stored)
+    return name, sealed, compression, len(data), zlib.crc32(data), entry_nonce
+
+
+def choose_compression(path, data, level=6):
+    """
+    Compresses `data` with zlib unless the format is already compressed or the result
+    isn't at least 5% smaller.
+
+    :return: The compression used and the stored bytes.
+    """
+    if path.lower().endswith(INCOMPRESSIBLE) or len(data) < 64:
+        return STORED, data
+    compressed = zlib.compress(data, level)
+    if len(compressed) > len(data) * 0.95:
+        return STORED, data
+    return ZLIB, compressed
+
+
+class PackWriter:
+    """
+    Writes a pack: every entry is compressed (when it pays off) and sealed with AES-GCM,
+    followed by an encrypted index with the position of each entry.
+
+    The key is derived from the game key and a salt. The nonce of each entry is derived
+    from its content, so the pack only depends on the salt and on the entries and their
+    order: with `deterministic_salt` the same files always give the same pack.
+
+    :param path: Path of the pack.
+    :param master_key: The game key (VNE_KEY).
+    :param salt: 16 bytes used to derive the pack key, random by default.
+    """
+    def __init__(self, path, master_key, salt=None):
+        self.salt = salt if salt is not None else os.urandom(16)
+        self.key = derive_key(master_key, self.salt)
+        self.nonce_key = derive_key(master_key, self.salt, b"vne-pack-nonce")
+        self.index = {}
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, FORMAT_VERSION, self.salt, 0, 0))
+
+    def add(self, name, data, compression=None):
+        """
+        Adds an entry.
+
+        :param name: Path of the entry inside the pack, with "/" separators.
+        :param data: The content of the entry.
+        :param compression: STORED or ZLIB, chosen with `choose_compression` by default.
+        """
+        if name in self.index:
+            raise Exception(f"[pack] Duplicated entry '{name}'.")
+        if compression is None:
+            compression, stored = choose_compression(name, data)
+        elif compression == ZLIB:
+            stored = zlib.compress(data, 6)
+        else:
+            stored = data
+        self.add_stored(name, stored, compression, len(data), zlib.crc32(data))
+
+    def add_stored(self, name, stored, compression, size, crc):
+        """
+        Adds an entry that is already compressed as `compression`.
+        """
+        sealed, entry_nonce = seal(self.key, self.nonce_key, name, stored)
+        self.add_sealed(name, sealed, compression, size, crc, entry_nonce)
+
+    def add_sealed(self, name, sealed, compression, size, crc, entry_nonce):
+        """
+        Adds an entry sealed with `seal` (or prepared with `seal_file`) using the keys of
+        this writer.
+        """
+        if name in self.index:
+            raise Exception(f"[pack] Duplicated entry '{name}'.")
+        self.index[name] = [self.file.tell(), len(sealed), size, compression, entry_nonce, crc]
+        self.file.write(sealed)
+
+    def close(self):
+        index = json.dumps(self.index, separators=(",", ":")).encode("utf-8")
+        index_nonce = nonce(derive_nonce(self.nonce_key, b"index", index))
+        sealed = AESGCM(self.key).encrypt(index_nonce, index, b"index")
+        index_offset = self.file.tell()
+        self.file.write(index_nonce + sealed)
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, FORMAT_VERSION, self.salt, index_offset, NONCE_SIZE + len(sealed)))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class PackReader:
+    """
+    Reads a pack through a read-only memory map. The index is decrypted once when the
+    pack is opened; reading an entry is a slice of the map, an AES-GCM decryption and,
+    for compressed entries, a decompression. Reads don't share any file position, so
+    they are safe from any thread.
+
+    :param path: Path of the pack.
+    :param master_key: The game key (VNE_KEY).
+    """
+    def __init__(self, path, master_key):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, salt, index_offset, index_size = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise Exception(f"[pack] '{path}' is not a pack.")
+        if version not in READ_VERSIONS:
+            raise Exception(f"[pack] '{path}' has format version {version}, expected {FORMAT_VERSION}.")
+        self.aead = AESGCM(derive_key(master_key, salt))
+        sealed = self.map[index_offset:index_offset + index_size]
+        index_nonce = nonce(0)
+        if version >= 2:
+            index_nonce, sealed = sealed[:NONCE_SIZE], sealed[NONCE_SIZE:]
+        try:
+            index = self.aead.decrypt(index_nonce, sealed, b"index")
+        except InvalidTag:
+            raise Exception(f"[pack] Can't open '{path}': wrong key or corrupted file.")
+        self.index = json.loads(index)
+
+    def read(self, name):
+        """
+        Returns the content of the entry `name`.
+
+        :raises KeyError: If the pack doesn't have the entry.
+        """
+        offset, stored_size, size, compression, entry_nonce, crc = self.index[name]
+        try:
+            data = self.aead.decrypt(nonce(entry_nonce), self.map[offset:offset + stored_size], name.encode("utf-8"))
+        except InvalidTag:
+            raise Exception(f"[pack] Entry '{name}' of '{self.path}' is corrupted.")
+        if compression == ZLIB:
+            data = zlib.decompress(data)
+        return data
+
+    def crc(self, name):
+        return self.index[name][5]
+
+    def namelist(self):
+        return list(self.index)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def close(self):
+        self.map.close()
+        self.file.close()
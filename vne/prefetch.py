@@ -0,0 +1,275 @@
+import io
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pygame
+
+
+class ScenePrefetcher:
+    """
+    Loads the scenes the player may enter next on a background thread, so the scene
+    switch finds them already compiled in the script cache.
+
+    Scenes referenced by the running script (``Scene("x")`` button events and
+    ``@jump_scene``) are loaded first; scenes defined with ``@scene`` are loaded when
+    the worker has nothing better to do.
+    """
+    HIGH = 1
+    LOW = 2
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.queue = queue.PriorityQueue()
+        # path: (cache key when it was queued, future, priority it's queued with)
+        self.futures = {}
+        self.order = itertools.count()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.loaded = 0
+        self.failed = 0
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.worker, name="vne-scene-prefetch", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.queue.put((0, next(self.order), None))
+            self.thread = None
+
+    def prefetch(self, path, priority=LOW):
+        """
+        Queues the script at `path` to be loaded in the background. A scene that is already
+        queued is only queued again to raise its priority, and a scene that was loaded is
+        skipped while it's still in the script cache with the same content hash.
+        """
+        key = self.engine.event_manager.script_key(path, self.engine)
+        with self.lock:
+            entry = self.futures.get(path)
+            if entry is not None:
+                queued_key, future, queued_priority = entry
+                if not future.done():
+                    if priority >= queued_priority:
+                        return
+                elif queued_key == key and self.current(key, future):
+                    return
+                else:
+                    future = Future()
+            else:
+                future = Future()
+            self.futures[path] = (key, future, priority)
+        self.queue.put((priority, next(self.order), path))
+        self.start()
+
+    def current(self, key, future):
+        """
+        Returns True if the finished load `future` still stands for the script with
+        cache key `key`: it's still cached, or it failed and the file didn't change.
+        """
+        if key in self.engine.script_cache:
+            return True
+        return not future.cancelled() and future.exception() is not None
+
+    def prefetch_references(self, script):
+        """
+        Queues every scene the script can switch to: ``Scene()`` events of its menu
+        buttons and its ``@jump_scene``/``@process_scene`` commands.
+        """
+        for opcode, args in script.commands:
+            if opcode == "button":
+                opcode, args = args[1]
+            if opcode in ("Scene", "process_scene", "jump_scene"):
+                scene_alias, = args
+                self.prefetch(self.engine.event_manager.scene_path(scene_alias, self.engine), self.HIGH)
+
+    def wait(self, path):
+        """
+        Blocks until the background load of `path` finishes if the worker is loading it right
+        now. A load that hasn't started is cancelled, so the worker doesn't load the scene
+        again after the caller did. Errors are ignored: the caller loads the scene again
+        and reports them.
+        """
+        entry = self.futures.get(path)
+        if entry is not None and not entry[1].cancel():
+            entry[1].exception()
+
+    def worker(self):
+        while True:
+            _, _, path = self.queue.get()
+            if path is None:
+                return
+            entry = self.futures.get(path)
+            # Already loaded from an earlier entry of the queue, or cancelled by `wait`.
+            if entry is None or entry[1].done() or not entry[1].set_running_or_notify_cancel():
+                continue
+            future = entry[1]
+            try:
+                future.set_result(self.engine.event_manager.load_script(path, self.engine))
+                self.loaded += 1
+            except Exception as e:
+                future.set_exception(e)
+                self.failed += 1
+                self.engine.Log(f"[prefetch] Error loading '{path}': {e}")
+
+    def stats(self):
+        return f"prefetch: {self.loaded} scenes loaded, {self.failed} failed, {self.queue.qsize()} queued"
+
+
+class AssetPrefetcher:
+    """
+    Decodes the images and sounds of the commands about to run on a thread pool, so
+    `@bg`, `@sprite`, `@bgm`, `@sfx` and `@SplashScreen` find them already loaded.
+    Music is only opened, it's decoded while it plays.
+
+    The next `prefetch_lookahead` commands from the lexer position are scanned. Compiled
+    scripts keep both branches of an ``@if`` in the command list (the branch not taken is
+    jumped over), so the window covers every branch of the pending conditionals. Assets
+    of a branch that isn't taken are dropped once the window moves past them.
+    """
+    # opcode: kind of asset, folder and extension
+    ASSETS = {
+        "bg": ("image", os.path.join("images", "bg"), ".jpg"),
+        "sprite": ("image", os.path.join("images", "sprites"), ".png"),
+        "SplashScreen": ("image", "ui", ".jpg"),
+        "bgm": ("music", os.path.join("audio", "bgm"), ".mp3"),
+        "sfx": ("sound", os.path.join("audio", "sfx"), ".mp3")
+    }
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.enabled = engine.config.get("prefetch_assets", True)
+        self.lookahead = engine.config.get("prefetch_lookahead", 32)
+        self.workers = engine.config.get("prefetch_workers", 2)
+        self.pool = None
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.commands = None
+        self.window_start = 0
+        self.next_scan = 0
+        self.hits = 0
+        self.late = 0
+        self.misses = 0
+        self.unused = 0
+        self.stall = 0.0
+
+    def asset(self, command):
+        """
+        Returns the (kind, path) of the asset used by `command`, or None.
+        """
+        opcode, args = command
+        entry = self.ASSETS.get(opcode)
+        if entry is None:
+            return None
+        kind, folder, extension = entry
+        return kind, os.path.join(folder, args[0] + extension)
+
+    def scan(self):
+        """
+        Queues the assets of the upcoming commands. Called before every command, it only
+        scans again when the lexer leaves the first half of the last window or jumps.
+        """
+        if not self.enabled:
+            return
+        lexer = self.engine.lexer
+        current = lexer.current
+        if lexer.commands is self.commands and self.window_start <= current < self.next_scan:
+            return
+        self.commands = lexer.commands
+        self.window_start = current
+        self.next_scan = current + max(1, self.lookahead // 2)
+        window = set()
+        for command in lexer.commands[current:current + self.lookahead]:
+            key = self.asset(command)
+            if key is None or key in window:
+                continue
+            window.add(key)
+            if key not in self.pending and not self.resident(key, command):
+                self.submit(key)
+        with self.lock:
+            for key in [key for key, future in self.pending.items() if key not in window and future.done()]:
+                future = self.pending.pop(key)
+                if key[0] == "music":
+                    self.close_stream(future)
+                self.unused += 1
+
+    def resident(self, key, command):
+        kind, path = key
+        if kind == "image":
+            return (path, None) in self.engine.images.cache
+        if kind == "sound":
+            opcode, args = command
+            return (opcode, args[0]) in self.engine.sounds
+        return False
+
+    def submit(self, key):
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix="vne-asset-prefetch")
+        kind, path = key
+        if kind == "image":
+            load = self.engine.images.decode
+        elif kind == "music":
+            load = self.engine.resource_manager.open
+        else:
+            load = self.load_sound
+        with self.lock:
+            self.pending[key] = self.pool.submit(load, path)
+
+    def load_sound(self, path):
+        return pygame.mixer.Sound(io.BytesIO(self.engine.resource_manager.get_bytes(path)))
+
+    def fetch(self, key, load):
+        """
+        Returns the asset `key`: the prefetched one, waiting for it if it's still being
+        decoded, or the result of `load` if it wasn't prefetched. Prefetch errors are
+        ignored, `load` runs again and reports them.
+
+        :param key: (kind, path) of the asset.
+        :param load: Function that loads the asset on this thread.
+        """
+        with self.lock:
+            future = self.pending.pop(key, None)
+        start = time.perf_counter()
+        if future is None:
+            self.misses += 1
+            value = load()
+        else:
+            if future.done():
+                self.hits += 1
+            else:
+                self.late += 1
+            try:
+                value = future.result()
+            except Exception:
+                value = load()
+        self.stall += time.perf_counter() - start
+        return value
+
+    def stop(self):
+        """
+        Cancels the prefetches that haven't started and closes the music streams that were
+        opened (or are still being opened) for tracks that will never play.
+        """
+        with self.lock:
+            pending = list(self.pending.items())
+            self.pending.clear()
+        for key, future in pending:
+            if not future.cancel() and key[0] == "music":
+                future.add_done_callback(self.close_stream)
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def close_stream(self, future):
+        if future.exception() is None:
+            future.result().close()
+
+    def stats(self):
+        used = self.hits + self.late + self.misses
+        rate = self.hits / used * 100 if used else 0.0
+        return (f"assets: {rate:.0f}% prefetch hits ({self.hits} ready, {self.late} late, {self.misses} missed), "
+                f"{self.stall * 1000:.0f} ms stalled, {self.unused} unused")
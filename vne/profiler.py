@@ -0,0 +1,193 @@
+import json
+import os
+import threading
+import time
+from array import array
+
+
+class NullSpan:
+    """
+    The span returned while profiling is disabled, entering and leaving it does nothing.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    def __init__(self, profiler, name, detail):
+        self.profiler = profiler
+        self.name = name
+        self.detail = detail
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter(), self.detail)
+        return False
+
+
+# Upper bounds of the latency histogram buckets, in milliseconds.
+HISTOGRAM_BUCKETS = (0.1, 0.5, 1, 5, 10, 50, 100)
+
+
+def percentile(samples, fraction):
+    """
+    Returns the value below which `fraction` of the sorted `samples` fall.
+    """
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+class Profiler:
+    """
+    Measures the time spent in the engine: event handlers, resource reads, decryption,
+    image decoding and each drawing stage, plus the duration of every frame.
+
+    While disabled, :meth:`span` returns a shared object that does nothing, so the
+    instrumented code only pays for one method call.
+
+    :param enabled: Starts recording right away.
+    :param max_events: Number of trace events kept for :meth:`export_chrome_trace`. Latency
+                       statistics keep counting after the limit is reached.
+    """
+    def __init__(self, enabled=False, max_events=1000000):
+        self.enabled = enabled
+        self.max_events = max_events
+        self.origin = time.perf_counter()
+        self.events = []
+        self.samples = {}
+        self.frames = array("d")
+        self.last_frame = None
+        self.lock = threading.Lock()
+
+    def span(self, name, detail=None):
+        """
+        Returns a context manager that records the time spent inside it under `name`.
+
+        :param name: Name of the measured operation, eg. "dispatch:bg" or "get_bytes".
+        :param detail: Optional value shown in the trace viewer, eg. the file path.
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, detail)
+
+    def record(self, name, start, end, detail=None):
+        with self.lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = array("d")
+            samples.append(end - start)
+            if len(self.events) < self.max_events:
+                self.events.append((name, start, end, threading.get_ident(), detail))
+
+    def frame(self):
+        """
+        Marks the start of a frame. The time between two marks is recorded as a frame time.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.last_frame is not None:
+            self.frames.append(now - self.last_frame)
+            if len(self.events) < self.max_events:
+                self.events.append(("frame", self.last_frame, now, threading.get_ident(), None))
+        self.last_frame = now
+
+    def histogram(self, name, buckets=HISTOGRAM_BUCKETS):
+        """
+        Counts the samples of `name` (or the frame times for "frame") that fall under each
+        bucket, in milliseconds.
+
+        :return: A list of (upper bound in ms, count) pairs, the last bound being None.
+        """
+        samples = self.frames if name == "frame" else self.samples.get(name, ())
+        counts = [0] * (len(buckets) + 1)
+        for duration in samples:
+            duration *= 1000
+            index = 0
+            while index < len(buckets) and duration > buckets[index]:
+                index += 1
+            counts[index] += 1
+        return list(zip(list(buckets) + [None], counts))
+
+    def summary(self):
+        """
+        Returns the latency statistics of every span name and of the frames, in milliseconds.
+        """
+        result = {}
+        with self.lock:
+            named = [(name, sorted(samples)) for name, samples in self.samples.items()]
+        named.append(("frame", sorted(self.frames)))
+        for name, samples in named:
+            if not samples:
+                continue
+            result[name] = {
+                "count": len(samples),
+                "total": sum(samples) * 1000,
+                "p50": percentile(samples, 0.50) * 1000,
+                "p90": percentile(samples, 0.90) * 1000,
+                "p99": percentile(samples, 0.99) * 1000,
+                "max": samples[-1] * 1000,
+                "histogram": self.histogram(name)
+            }
+        return result
+
+    def frame_stats(self):
+        """
+        Returns a one line summary of the frame times, shown in devMode.
+        """
+        samples = sorted(self.frames[-300:])
+        return (f"frames: p50 {percentile(samples, 0.50) * 1000:.1f} ms, "
+                f"p90 {percentile(samples, 0.90) * 1000:.1f} ms, p99 {percentile(samples, 0.99) * 1000:.1f} ms")
+
+    def report(self):
+        """
+        Returns the summary as text, one span name per line sorted by total time, followed
+        by the latency histogram of every span name: the number of samples in each bucket.
+        """
+        summary = sorted(self.summary().items(), key=lambda item: -item[1]["total"])
+        lines = [f"{'name':<32}{'count':>8}{'total ms':>12}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}"]
+        for name, stats in summary:
+            lines.append(f"{name:<32}{stats['count']:>8}{stats['total']:>12.2f}{stats['p50']:>9.3f}"
+                         f"{stats['p90']:>9.3f}{stats['p99']:>9.3f}{stats['max']:>9.3f}")
+        bounds = [f"<={bound:g}" for bound in HISTOGRAM_BUCKETS] + [f">{HISTOGRAM_BUCKETS[-1]:g}"]
+        lines.append("")
+        lines.append(f"{'histogram (ms)':<32}" + "".join(f"{bound:>8}" for bound in bounds))
+        for name, stats in summary:
+            lines.append(f"{name:<32}" + "".join(f"{count:>8}" for _, count in stats["histogram"]))
+        return "\n".join(lines)
+
+    def export_chrome_trace(self, path):
+        """
+        Writes the recorded events in the Chrome trace-event format, which can be opened in
+        chrome://tracing or https://ui.perfetto.dev.
+        """
+        pid = os.getpid()
+        with self.lock:
+            events = list(self.events)
+        trace_events = []
+        for name, start, end, thread, detail in events:
+            event = {
+                "name": name,
+                "cat": name.split(":")[0],
+                "ph": "X",
+                "ts": (start - self.origin) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": pid,
+                "tid": thread
+            }
+            if detail is not None:
+                event["args"] = {"detail": str(detail)}
+            trace_events.append(event)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
@@ -1,6 +1,8 @@
 import os
 import pygame
 from vne.config import engine_version
+from vne.cache import LRUCache
+from vne.text import TextLayout
 
 class Renderer:
     def __init__(self, engine):
@@ -14,11 +16,18 @@ class Renderer:
         ), flags=pygame.HWSURFACE | pygame.DOUBLEBUF | pygame.HIDDEN)
         self.clock = pygame.time.Clock()
         self.fps = 0
+        self.dialogue_margin = 10
+        # alias -> ((image, screen width, scale), scaled image)
+        self.sprite_cache = {}
+        # Rendered dialogue lines and name boxes.
+        self.text_cache = LRUCache("text", 64)
+        self.layout = TextLayout()
 
         pygame.display.set_caption(f"VNE {engine_version}")
 
-        if self.window_icon():
-            pygame.display.set_icon(self.window_icon())
+        icon = self.window_icon()
+        if icon:
+            pygame.display.set_icon(icon)
             self.engine.Log("[window] game icon was loaded")
  
         self.font = None
@@ -52,21 +61,7 @@ class Renderer:
         Divides the text into lines, so that each line does not exceed max_width pixels,
         using the font size.
         """
-        words = text.split()
-        lines = []
-        current_line = ""
-        for word in words:
-            test_line = current_line + (" " if current_line else "") + word
-            if font.size(test_line)[0] <= max_width:
-                current_line = test_line
-            else:
-                if current_line:
-                    lines.append(current_line)
-                current_line = word
-        if current_line:
-            lines.append(current_line)
-        return lines
-        
+        return self.layout.wrap(text, font, max_width)
 
     def draw_background(self):
         if self.engine.current_bg:
@@ -74,73 +69,118 @@ class Renderer:
         else:
             self.screen.fill(self.engine.config.get("bg_color", (0, 0, 0)))
     
+    def default_dialogue_rect(self):
+        return {
+            "x": 0,
+            "y": self.engine.config.get("screen_height", 600) - 150,
+            "width": self.engine.config.get("screen_width", 800) - 100,
+            "height": 100,
+            "bg_color": (50, 50, 50),
+            "border_color": (255, 255, 255)
+        }
+
+    def default_namebox_rect(self):
+        return {
+            "x": 50,
+            "y": self.engine.config.get("screen_height", 600) - 210,
+            "width": 200,
+            "height": 40,
+            "bg_color": (50, 50, 50),
+            "border_color": (255, 255, 255)
+        }
+
+    def dialogue_rect(self):
+        rect_cfg = self.engine.config.get("dialogue_rect") or self.default_dialogue_rect()
+        return rect_cfg, pygame.Rect(rect_cfg["x"], rect_cfg["y"], rect_cfg["width"], rect_cfg["height"])
+
+    def dialogue_pages(self, text):
+        """
+        Returns the rendered lines of a dialogue wrapped to the dialogue box, grouped in pages
+        that fit its height. Wrapping and rendering happen once per (text, font, box size);
+        frames spent waiting for input reuse them.
+        """
+        _, dialogue_rect = self.dialogue_rect()
+        key = (text, self.font, dialogue_rect.size)
+        pages = self.text_cache.get(key)
+        if pages is None:
+            lines = self.wrap_text(text, self.font, dialogue_rect.width - 2 * self.dialogue_margin)
+            line_height = self.font.get_height() + 2
+            pages = [[self.font.render(line, True, (255, 255, 255)) for line in page]
+                     for page in self.layout.paginate(lines, line_height, dialogue_rect.height - 2 * self.dialogue_margin + 2)]
+            self.text_cache.put(key, pages)
+        return pages
+
     def draw_dialogue(self):
         if self.engine.current_dialogue:
-            rect_cfg = self.engine.config.get("dialogue_rect", {
-                "x": 0,
-                "y": self.engine.config.get("screen_height", 600) - 150,
-                "width": self.engine.config.get("screen_width", 800) - 100,
-                "height": 100,
-                "bg_color": (50, 50, 50),
-                "border_color": (255, 255, 255)
-            })
-            dialogue_rect = pygame.Rect(rect_cfg["x"], rect_cfg["y"], rect_cfg["width"], rect_cfg["height"])
+            rect_cfg, dialogue_rect = self.dialogue_rect()
             pygame.draw.rect(self.screen, rect_cfg["bg_color"], dialogue_rect)
-             
-            
-            margin = 10
-            max_text_width = dialogue_rect.width - 2 * margin
-            lines = self.wrap_text(self.engine.current_dialogue, self.font, max_text_width)
-           
+
+            margin = self.dialogue_margin
+            line_height = self.font.get_height() + 2
+
+            pages = self.dialogue_pages(self.engine.current_dialogue)
             y_offset = dialogue_rect.y + margin
-            for line in lines:
-                text_surface = self.font.render(line, True, (255, 255, 255))
+            for text_surface in pages[min(self.engine.dialogue_page, len(pages) - 1)]:
                 self.screen.blit(text_surface, (dialogue_rect.x + margin, y_offset))
-                y_offset += self.font.get_height() + 2
+                y_offset += line_height
 
     def draw_character_name(self):
         if self.engine.current_character_name:
-            namebox_cfg = self.engine.config.get("namebox_rect", {
-                "x": 50,
-                "y": self.engine.config.get("screen_height", 600) - 210,
-                "width": 200,
-                "height": 40,
-                "bg_color": (50, 50, 50),
-                "border_color": (255, 255, 255)
-            })
+            namebox_cfg = self.engine.config.get("namebox_rect") or self.default_namebox_rect()
             namebox_rect = pygame.Rect(namebox_cfg["x"], namebox_cfg["y"], namebox_cfg["width"], namebox_cfg["height"])
             pygame.draw.rect(self.screen, namebox_cfg["bg_color"], namebox_rect)
-            name_surface = self.name_font.render(self.engine.current_character_name, True, (255, 255, 255))
+            key = (self.engine.current_character_name, self.name_font)
+            name_surface = self.text_cache.get(key)
+            if name_surface is None:
+                name_surface = self.name_font.render(self.engine.current_character_name, True, (255, 255, 255))
+                self.text_cache.put(key, name_surface)
             self.screen.blit(name_surface, (namebox_rect.x + 10, namebox_rect.y + 10))
     
+    def sprite_scale(self, screen_width):
+        """
+        Interpolates the sprite scale between `sprite_scale` (800px wide screens or less)
+        and `sprite_scale_high` (1280px or more).
+        """
+        base_low = 800
+        base_high = 1280
+        default_scale = self.engine.config.get("sprite_scale", 0.5)
+        high_scale = self.engine.config.get("sprite_scale_high", 0.40)
+        if screen_width <= base_low:
+            return default_scale
+        elif screen_width >= base_high:
+            return high_scale
+        t = (screen_width - base_low) / (base_high - base_low)
+        return default_scale + t * (high_scale - default_scale)
+
+    def scaled_sprite(self, alias, image, screen_width):
+        """
+        Returns the sprite image scaled for the current screen. The result is cached per
+        sprite and only recomputed when its image, the screen width or the scale changes.
+        """
+        sprite_scale = self.sprite_scale(screen_width)
+        key = (image, screen_width, sprite_scale)
+        cached = self.sprite_cache.get(alias)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        new_width = int(screen_width * sprite_scale)
+        new_height = int(image.get_height() * new_width / image.get_width())
+        scaled_image = pygame.transform.smoothscale(image, (new_width, new_height))
+        self.sprite_cache[alias] = (key, scaled_image)
+        return scaled_image
+
     def draw_sprites(self):
         if hasattr(self.engine, "sprites"):
             screen_width = self.engine.config.get("screen_width", 800)
             screen_height = self.engine.config.get("screen_height", 600)
-            
-           
-            base_low = 800
-            base_high = 1280
-            default_scale = self.engine.config.get("sprite_scale", 0.5)
-            high_scale = self.engine.config.get("sprite_scale_high", 0.40)
-            if screen_width <= base_low:
-                sprite_scale = default_scale
-            elif screen_width >= base_high:
-                sprite_scale = high_scale
-            else:
-                t = (screen_width - base_low) / (base_high - base_low)
-                sprite_scale = default_scale + t * (high_scale - default_scale)
+
+            if len(self.sprite_cache) > len(self.engine.sprites):
+                self.sprite_cache = {alias: cached for alias, cached in self.sprite_cache.items()
+                                     if alias in self.engine.sprites}
             
             for alias, sprite_data in self.engine.sprites.items():
-                image = sprite_data["image"]
+                scaled_image = self.scaled_sprite(alias, sprite_data["image"], screen_width)
                 position = sprite_data.get("position", "center")
-                
-                desired_width = int(screen_width * sprite_scale)
-                scale_factor = desired_width / image.get_width()
-                new_width = desired_width
-                new_height = int(image.get_height() * scale_factor)
-                zoom_factor = new_width / image.get_width()
-                scaled_image = pygame.transform.rotozoom(image, 0, zoom_factor)
+                new_width, new_height = scaled_image.get_size()
                 
                 if position.lower() == "left":
                     x = 3
@@ -156,33 +196,43 @@ class Renderer:
 
     def window_icon(self):
         """
-        Loads and stores a sprite image with a specified alias and position.
+        Loads the default window icon, returns None if the game doesn't have one.
         """
-        load_image = self.engine.lexer.load_image
         relative_path = os.path.join("ui", "icon", "window_icon" + ".png")
         try:
-            image_bytes = self.engine.resource_manager.get_bytes(relative_path)
-
-            if image_bytes:
-                icon = load_image(relative_path)
-
-                return icon
-             
-            return None
+            return self.engine.images.load(relative_path)
         except Exception as e:
-            pass
+            return None
     
+    def draw_dev_stats(self):
+        """
+        Draws the FPS counter and the engine statistics in the top left corner.
+        """
+        y = 2
+        for line in [f"{self.fps}"] + self.engine.dev_stats():
+            counter_surface = self.fps_font.render(line, True, (0, 0, 0))
+            self.screen.blit(counter_surface, (2, y))
+            y += self.fps_font.get_height()
+
     def render(self):
-            
-        self.draw_background()
-        self.draw_sprites()
-        self.draw_character_name()
-        self.draw_dialogue()
+        profiler = self.engine.profiler
+        profiler.frame()
+        self.engine.mixer.update()
+
+        with profiler.span("draw_background"):
+            self.draw_background()
+        with profiler.span("draw_sprites"):
+            self.draw_sprites()
+        with profiler.span("draw_character_name"):
+            self.draw_character_name()
+        with profiler.span("draw_dialogue"):
+            self.draw_dialogue()
         
-        self.clock.tick(30)
+        self.clock.tick(30 if self.engine.frame_pacing else 0)
         self.fps = int(self.clock.get_fps())
 
         if self.engine.devMode:
-            counter_surface = self.fps_font.render(f"{self.fps}", True, (0, 0, 0))
-            self.screen.blit(counter_surface, (2, 2))
-        pygame.display.update()
+            with profiler.span("draw_dev_stats"):
+                self.draw_dev_stats()
+        with profiler.span("display_update"):
+            pygame.display.update()
@@ -1,67 +1,253 @@
+import bisect
+import io
 import os
+import threading
+import time
 import pyzipper
 from .config import key
+from .profiler import Profiler
+from .pack import PackReader, is_pack
+
+PACK = "pack"
+ZIP = "zip"
+LOOSE = "loose"
+
+class PathIndex:
+    """
+    A snapshot of the available paths. It isn't changed once built: a refresh builds a
+    new one, so a reader that keeps a reference sees consistent paths and keys.
+
+    :param paths: Index key of every path: (source, name in the source).
+    :param loose_dirs: Folders of the loose data and their modification time.
+    """
+    def __init__(self, paths, loose_dirs):
+        self.paths = paths
+        self.sorted_keys = sorted(paths)
+        self.loose_dirs = loose_dirs
+
 
 class ResourceManager:
-    def __init__(self, base_path, log):
+    """
+    Reads the game files from data.pkg or the loose data folder. Every available path is
+    indexed when the manager is created, so lookups don't touch the file system.
+
+    :param base_path: The game folder.
+    :param log: Function used to log messages.
+    :param profiler: Optional `vne.profiler.Profiler`.
+    :param watch: Refreshes the index when files are added or removed (dev mode).
+    """
+    def __init__(self, base_path, log, profiler=None, watch=False):
         self.base_path = base_path
         self.Log = log
+        self.profiler = profiler or Profiler()
         self.pkg_path = os.path.join(base_path, "data.pkg")
         self.data_folder = os.path.join(base_path, "data")
+        self.pack = None
         self.zipfile = None
+        # ZIP handles keep a file position, so every thread reads through its own handle.
+        # data.pkg packs are memory mapped and loose files are opened per read.
+        self.local = threading.local()
+        self.handles = []
+        self.lock = threading.Lock()
 
         if os.path.exists(self.pkg_path):
             try:
-                 
-                self.zipfile = pyzipper.AESZipFile(self.pkg_path, "r")
-         
-                self.zipfile.setpassword(key)
+                if is_pack(self.pkg_path):
+                    self.pack = PackReader(self.pkg_path, key)
+                else:
+                    # ZIP packs written by older builds.
+                    self.zipfile = self.open_zip()
+                    self.local.zipfile = self.zipfile
                 self.Log(f"[ResourceManager] data.pkg found at {self.pkg_path}")
             except Exception as e:
                 self.Log(f"[ResourceManager] Error opening '{self.pkg_path}': {e}")
+                self.pack = None
                 self.zipfile = None
         else:
             self.Log(f"[ResourceManager] '{self.pkg_path}' not found. Using loose data folder.")
 
-    def get_bytes(self, internal_path):
+        self.watch = watch
+        self.refresh_interval = 1.0
+        self.case_insensitive = os.name == "nt"
+        self.build_index()
+
+    def build_index(self):
         """
-        Reads and returns the content of a file specified by the internal path from either a
-        password-protected zipfile or from the loose data folder, with fallback for alternative file names.
+        Indexes every available path: the entries of data.pkg and one walk of the loose
+        data folder. When a path exists in both, data.pkg wins, like in `get_bytes`.
         """
-       
-        zip_internal_path = internal_path.replace(os.sep, "/")
-  
+        paths = {}
+        loose_dirs = {}
+        if os.path.isdir(self.data_folder):
+            for root, dirs, files in os.walk(self.data_folder):
+                loose_dirs[root] = os.stat(root).st_mtime_ns
+                relative_root = os.path.relpath(root, self.data_folder).replace(os.sep, "/")
+                for file in files:
+                    name = file if relative_root == "." else f"{relative_root}/{file}"
+                    paths[self.index_key(name)] = (LOOSE, name)
         if self.zipfile:
+            for name in self.zipfile.namelist():
+                paths[self.index_key(name)] = (ZIP, name)
+        if self.pack:
+            for name in self.pack.namelist():
+                paths[self.index_key(name)] = (PACK, name)
+        # Published with a single assignment: readers on other threads see either the
+        # previous index or this one, never a mix of both.
+        self.index = PathIndex(paths, loose_dirs)
+        self.last_refresh = time.monotonic()
+
+    def index_key(self, internal_path):
+        key = internal_path.replace(os.sep, "/")
+        return key.lower() if self.case_insensitive else key
+
+    def refresh(self, throttle=True):
+        """
+        Rebuilds the index if a folder of the loose data changed (a file was added, removed
+        or renamed). Only used in dev mode, at most once every `refresh_interval` seconds
+        unless `throttle` is False; the folders are checked first either way.
+        """
+        if throttle and time.monotonic() - self.last_refresh < self.refresh_interval:
+            return False
+        with self.lock:
+            self.last_refresh = time.monotonic()
             try:
-                return self.zipfile.read(zip_internal_path)
-            except KeyError:
-                pass
+                changed = any(os.stat(folder).st_mtime_ns != mtime for folder, mtime in self.index.loose_dirs.items())
+            except OSError:
+                changed = True
+            if changed:
+                self.build_index()
+            return changed
+
+    def lookup(self, internal_path):
+        key = self.index_key(internal_path)
+        paths = self.index.paths
+        entry = paths.get(key)
+        if entry is None and key.endswith(".kag"):
+            entry = paths.get(key + "c")
+        return entry
+
+    def resolve(self, internal_path):
+        """
+        Returns the path `get_bytes` reads for `internal_path`: the path itself, or the
+        compiled .kagc file when a .kag source isn't available. None if neither exists.
+        """
+        entry = self.lookup(internal_path)
+        if entry is None and self.watch and self.refresh():
+            entry = self.lookup(internal_path)
+        return entry[1] if entry is not None else None
+
+    def exists(self, internal_path):
+        return self.resolve(internal_path) is not None
+
+    def list(self, prefix=""):
+        """
+        Returns every available path that starts with `prefix`, sorted, eg.
+        ``list("images/bg/")`` for all the backgrounds.
+        """
+        if self.watch:
+            self.refresh()
+        key_prefix = self.index_key(prefix)
+        index = self.index
+        keys = index.sorted_keys
+        start = bisect.bisect_left(keys, key_prefix)
+        names = []
+        for position in range(start, len(keys)):
+            if not keys[position].startswith(key_prefix):
+                break
+            names.append(index.paths[keys[position]][1])
+        return names
+
+    def open_zip(self):
+        archive = pyzipper.AESZipFile(self.pkg_path, "r")
+        archive.setpassword(key)
+        with self.lock:
+            self.handles.append(archive)
+        return archive
+
+    def thread_zip(self):
+        """
+        Returns the ZIP handle of the calling thread, opening it on the first read.
+        """
+        archive = getattr(self.local, "zipfile", None)
+        if archive is None:
+            archive = self.open_zip()
+            self.local.zipfile = archive
+        return archive
+
+    def get_bytes(self, internal_path):
+        """
+        Reads and returns the content of a file specified by the internal path from either
+        data.pkg or the loose data folder. A .kag path falls back to its compiled .kagc file.
+        It can be called from any thread.
+        """
+        with self.profiler.span("get_bytes", internal_path):
+            return self.read_bytes(internal_path)
 
-        local_path = os.path.join(self.data_folder, internal_path)
-        if os.path.exists(local_path):
-            with open(local_path, "rb") as f:
+    def read_bytes(self, internal_path, retry=True):
+        entry = self.lookup(internal_path)
+        # A miss may be a file added since the index was built, checked right away.
+        if entry is None and self.watch and self.refresh(throttle=False):
+            entry = self.lookup(internal_path)
+        if entry is None:
+            raise FileNotFoundError(f"'{internal_path}' not found in data.pkg nor in '{self.data_folder}'")
+        source, name = entry
+        if source == PACK:
+            return self.pack.read(name)
+        if source == ZIP:
+            return self.thread_zip().read(name)
+        try:
+            with open(os.path.join(self.data_folder, name), "rb") as f:
                 return f.read()
+        except FileNotFoundError:
+            # The file was removed or renamed after the index was built.
+            if retry and self.watch and self.refresh(throttle=False):
+                return self.read_bytes(internal_path, retry=False)
+            raise
 
-        
-        if internal_path.lower().endswith(".kag"):
-            alt_path = internal_path[:-4] + ".kagc"
-            zip_alt_path = alt_path.replace(os.sep, "/")
-            self.Log(f"[ResourceManager] Retrying with '{zip_alt_path}'")
-            if self.zipfile:
-                try:
-                    return self.zipfile.read(zip_alt_path)
-                except KeyError:
-                    pass
-            local_alt = os.path.join(self.data_folder, alt_path)
-            if os.path.exists(local_alt):
-                with open(local_alt, "rb") as f:
-                    return f.read()
-
-        raise FileNotFoundError(f"'{internal_path}' not found in data.pkg nor in '{local_path}'")
+    def open(self, internal_path):
+        """
+        Returns a binary file object with the content of a file, for readers that stream it
+        (eg. background music). Loose files are opened directly and read as they are
+        consumed; entries of data.pkg are decrypted as a whole and served from memory.
+        """
+        entry = self.lookup(internal_path)
+        if entry is not None and entry[0] == LOOSE:
+            try:
+                return open(os.path.join(self.data_folder, entry[1]), "rb")
+            except FileNotFoundError:
+                pass
+        return io.BytesIO(self.get_bytes(internal_path))
+
+    def content_hash(self, internal_path):
+        """
+        Returns a value that changes when the content of a file changes, without reading
+        it. Entries of data.pkg use the CRC stored in the pack index (or the archive
+        directory); loose files use their modification time and size.
+
+        :return: The value, or None if the file isn't indexed or can't be found.
+        """
+        entry = self.lookup(internal_path)
+        if entry is None:
+            return None
+        source, name = entry
+        if source == PACK:
+            return self.pack.crc(name)
+        if source == ZIP:
+            return self.zipfile.getinfo(name).CRC
+        try:
+            stat = os.stat(os.path.join(self.data_folder, name))
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
 
     def close(self):
+        if self.pack:
+            self.pack.close()
+            self.pack = None
         if self.zipfile:
-            self.zipfile.close()
+            for archive in self.handles:
+                archive.close()
+            self.handles = []
             self.zipfile = None
 
     def __del__(self):
@@ -0,0 +1,86 @@
+class TextLayout:
+    """
+    Word-wraps text in linear time. The width of every word (and of the space) is
+    measured once per font and cached, lines are built by adding up those widths
+    instead of measuring the growing line again for every word.
+
+    :param max_words: Number of cached word widths per font before the cache is reset.
+    """
+    def __init__(self, max_words=8192):
+        self.max_words = max_words
+        self.metrics = {}
+
+    def word_width(self, font, word):
+        widths = self.metrics.get(font)
+        if widths is None:
+            widths = self.metrics[font] = {}
+        width = widths.get(word)
+        if width is None:
+            if len(widths) >= self.max_words:
+                widths.clear()
+            width = widths[word] = font.size(word)[0]
+        return width
+
+    def split_word(self, word, font, max_width):
+        """
+        Splits a word wider than `max_width` into pieces that fit, measuring each character once.
+        """
+        pieces = []
+        current = ""
+        current_width = 0
+        for char in word:
+            char_width = self.word_width(font, char)
+            if current and current_width + char_width > max_width:
+                pieces.append(current)
+                current = ""
+                current_width = 0
+            current += char
+            current_width += char_width
+        if current:
+            pieces.append(current)
+        return pieces
+
+    def wrap(self, text, font, max_width):
+        """
+        Divides the text into lines that don't exceed `max_width` pixels. Newlines (or the
+        ``\\n`` escape used in scripts) start a new line, and words longer than a line are split.
+
+        :return: The list of lines.
+        """
+        space_width = self.word_width(font, " ")
+        lines = []
+        for paragraph in text.replace("\\n", "\n").split("\n"):
+            current_words = []
+            current_width = 0
+            for word in paragraph.split():
+                width = self.word_width(font, word)
+                if width > max_width:
+                    pieces = self.split_word(word, font, max_width)
+                    word = pieces.pop()
+                    width = self.word_width(font, word)
+                    if current_words:
+                        lines.append(" ".join(current_words))
+                    lines.extend(pieces)
+                    current_words = []
+                    current_width = 0
+                if current_words and current_width + space_width + width > max_width:
+                    lines.append(" ".join(current_words))
+                    current_words = []
+                    current_width = 0
+                if current_words:
+                    current_width += space_width
+                current_words.append(word)
+                current_width += width
+            lines.append(" ".join(current_words))
+        while lines and not lines[-1]:
+            lines.pop()
+        return lines
+
+    def paginate(self, lines, line_height, max_height):
+        """
+        Groups the lines in pages of at most `max_height` pixels.
+
+        :return: A list of pages, each one a list of lines. There is always at least one page.
+        """
+        per_page = max(1, max_height // line_height)
+        return [lines[i:i + per_page] for i in range(0, len(lines), per_page)] or [[]]